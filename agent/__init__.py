@@ -1,3 +1,11 @@
-from .agent import InputMessage, StreamEvent, chat
+from .agent import InputMessage, ResponseChain, StreamEvent, chat
+from .history import CompactionStats, compact_history
 
-__all__ = ["InputMessage", "StreamEvent", "chat"]
+__all__ = [
+    "CompactionStats",
+    "InputMessage",
+    "ResponseChain",
+    "StreamEvent",
+    "chat",
+    "compact_history",
+]
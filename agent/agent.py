@@ -2,54 +2,82 @@ import os
 from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Literal, cast
+from typing import Any, Literal
 
-from openai import AsyncOpenAI
-from openai.types.responses import (
-    ResponseInputItemParam,
-    ToolParam,
-)
+from openai import AsyncOpenAI, BadRequestError, NotFoundError
+from openai.types.responses import ResponseInputItemParam
 
+from .registry import ToolRegistry
+from .scheduler import ToolScheduler
+from .streaming import coalesce
 from .tools import (
-    BaseTool,
+    CheckMedicationAvailability,
     GetDosageInstructions,
     GetMedicationsByIngredient,
     GetMedicationStock,
     LoadPrescriptions,
+    PlanPrescriptionFill,
     ReserveMedications,
 )
 
 MODEL = os.getenv("OPENAI_MODEL", "gpt-5")
 REASONING_EFFORT: Any = os.getenv("REASONING_EFFORT", "low")
+# Chain rounds server-side via previous_response_id instead of resending history
+RESPONSE_CHAINING = os.getenv("RESPONSE_CHAINING", "false").lower() == "true"
+# Start read-only tools as soon as their arguments finish streaming
+STREAM_TOOL_DISPATCH = os.getenv("STREAM_TOOL_DISPATCH", "true").lower() != "false"
 
 client = AsyncOpenAI()
 
 SYSTEM_PROMPT = (Path(__file__).parent / "system_prompt.md").read_text()
 
-# Register all tools here
-TOOLS: list[type[BaseTool]] = [
-    GetMedicationStock,
-    GetMedicationsByIngredient,
-    GetDosageInstructions,
-    LoadPrescriptions,
-    ReserveMedications,
-]
+# Register all tools here; schemas are computed once at startup
+registry = ToolRegistry()
+registry.register(CheckMedicationAvailability)
+registry.register(GetMedicationStock)
+registry.register(GetMedicationsByIngredient)
+registry.register(GetDosageInstructions)
+registry.register(LoadPrescriptions)
+registry.register(PlanPrescriptionFill)
+registry.register(ReserveMedications)
 
 # Type alias for conversation messages in Responses API format
 InputMessage = ResponseInputItemParam
 
 
-def _get_tools_schema() -> list[ToolParam]:
-    """Get OpenAI schema for all registered tools."""
-    return cast(list[ToolParam], [tool.to_openai_schema() for tool in TOOLS])
+@dataclass
+class ResponseChain:
+    """Server-side conversation state used for previous_response_id chaining."""
+
+    response_id: str
+    # Number of leading history messages already stored with the response
+    message_count: int
+
+
+def _unsent_messages(
+    messages: list[InputMessage], chain: ResponseChain
+) -> list[InputMessage] | None:
+    """
+    Return the messages the chained response has not seen yet.
+
+    Assistant replies are model output and already part of the stored
+    response, so they are skipped. Returns None if the history no longer
+    lines up with the chain (e.g. it was reset or compacted).
+    """
+    if chain.message_count > len(messages):
+        return None
+    return [
+        message
+        for message in messages[chain.message_count :]
+        if message.get("role") != "assistant"
+    ]
 
 
-def _execute_tool(name: str, arguments: str) -> str:
-    """Execute a tool by name."""
-    for tool in TOOLS:
-        if tool.name() == name:
-            return tool.run(arguments)
-    return '{"error": "Unknown tool: ' + name + '"}'
+def _is_chain_lost(error: Exception) -> bool:
+    """Check whether an API error means the previous response is gone."""
+    if isinstance(error, NotFoundError):
+        return True
+    return isinstance(error, BadRequestError) and "previous_response" in str(error)
 
 
 @dataclass
@@ -62,63 +90,157 @@ class StreamEvent:
     tool_result: str | None = None
     # Final messages returned with "done" event
     messages: list[InputMessage] | None = None
+    # Response chain to pass to the next chat() call (chaining mode only)
+    chain: ResponseChain | None = None
+
 
+async def _create_stream(
+    input_messages: list[Any],
+    previous_response_id: str | None,
+) -> Any:
+    """Start a streamed response, chained to a previous one if given."""
+    kwargs: dict[str, Any] = {}
+    if previous_response_id:
+        kwargs["previous_response_id"] = previous_response_id
+    return await client.responses.create(
+        model=MODEL,
+        instructions=SYSTEM_PROMPT,
+        input=input_messages,
+        tools=registry.schemas(),
+        reasoning={
+            "effort": REASONING_EFFORT,
+            "summary": "auto",
+        },
+        stream=True,
+        **kwargs,
+    )
 
-async def chat(messages: list[InputMessage]) -> AsyncIterator[StreamEvent]:
+
+async def chat(
+    messages: list[InputMessage],
+    chain: ResponseChain | None = None,
+) -> AsyncIterator[StreamEvent]:
     """
     Stream a chat completion response from OpenAI using the Responses API.
 
+    Adjacent reasoning/text deltas are coalesced (see agent.streaming) so
+    consumers handle fewer, larger events.
+
     Args:
         messages: Conversation history in Responses API format.
+        chain: Chain returned by the previous turn's "done" event. When
+            RESPONSE_CHAINING is enabled, only messages the chained response
+            has not seen are sent. If the server no longer has the response,
+            the full history is sent instead.
 
     Yields:
         StreamEvent objects containing reasoning, text, or tool_call content.
         The final event has type="done" and includes the updated messages list.
     """
+    async for event in coalesce(_chat(messages, chain)):
+        yield event
+
+
+async def _chat(
+    messages: list[InputMessage],
+    chain: ResponseChain | None,
+) -> AsyncIterator[StreamEvent]:
+    """Stream raw (uncoalesced) events for one user turn."""
     # Copy to avoid mutating the original
     input_messages: list[Any] = list(messages)
 
+    previous_response_id: str | None = None
+    pending: list[Any] | None = None
+    if RESPONSE_CHAINING and chain:
+        pending = _unsent_messages(messages, chain)
+        if pending is not None:
+            previous_response_id = chain.response_id
+
+    response_id: str | None = None
+
     try:
         while True:
-            stream = await client.responses.create(
-                model=MODEL,
-                instructions=SYSTEM_PROMPT,
-                input=input_messages,
-                tools=_get_tools_schema(),
-                reasoning={
-                    "effort": REASONING_EFFORT,
-                    "summary": "auto",
-                },
-                stream=True,
-            )
+            try:
+                stream = await _create_stream(
+                    pending if previous_response_id else input_messages,
+                    previous_response_id,
+                )
+            except (NotFoundError, BadRequestError) as e:
+                if not previous_response_id or not _is_chain_lost(e):
+                    raise
+                # Chain expired or was deleted: rebuild from the local history
+                previous_response_id = None
+                stream = await _create_stream(input_messages, None)
+
+            response_id = None
+            round_start = len(input_messages)
 
             function_calls: dict[str, dict[str, str]] = {}
             has_reasoning = False
 
-            async for event in stream:
-                if event.type == "response.reasoning_summary_text.delta":
-                    has_reasoning = True
-                    yield StreamEvent(type="reasoning", content=event.delta)
-                elif event.type == "response.output_text.delta":
-                    yield StreamEvent(type="text", content=event.delta)
-                elif event.type == "response.function_call_arguments.delta":
-                    call_id = event.item_id
-                    if call_id and call_id not in function_calls:
-                        function_calls[call_id] = {"name": "", "arguments": ""}
-                    if call_id:
-                        function_calls[call_id]["arguments"] += event.delta
-                elif event.type == "response.output_item.added":
-                    if event.item.type == "function_call":
-                        # Signal end of reasoning before tool calls
+            # Calls dispatched while the model is still streaming. Once a
+            # mutating call shows up, it and everything after it waits for
+            # the stream to end, so a failed stream never leaves a write behind.
+            scheduler = ToolScheduler(
+                registry.execute, registry.is_read_only, registry.is_cacheable
+            )
+            dispatched: set[str] = set()
+            deferring = not STREAM_TOOL_DISPATCH
+
+            try:
+                async for event in stream:
+                    if event.type == "response.reasoning_summary_text.delta":
+                        has_reasoning = True
+                        yield StreamEvent(type="reasoning", content=event.delta)
+                    elif event.type == "response.output_text.delta":
+                        # Reasoning always ends before answer text starts
                         if has_reasoning:
                             yield StreamEvent(type="reasoning_end", content="")
                             has_reasoning = False
-                        call_id = event.item.id
+                        yield StreamEvent(type="text", content=event.delta)
+                    elif event.type == "response.function_call_arguments.delta":
+                        call_id = event.item_id
+                        if call_id and call_id not in function_calls:
+                            function_calls[call_id] = {
+                                "name": "",
+                                "arguments": "",
+                                "call_id": call_id,
+                            }
                         if call_id:
+                            function_calls[call_id]["arguments"] += event.delta
+                    elif event.type == "response.output_item.added":
+                        if event.item.type == "function_call":
+                            # Signal end of reasoning before tool calls
+                            if has_reasoning:
+                                yield StreamEvent(type="reasoning_end", content="")
+                                has_reasoning = False
+                            call_id = event.item.id
+                            if call_id:
+                                function_calls[call_id] = {
+                                    "name": event.item.name,
+                                    "arguments": "",
+                                    "call_id": event.item.call_id or call_id,
+                                }
+                    elif event.type == "response.output_item.done":
+                        if event.item.type == "function_call" and event.item.id:
+                            call_id = event.item.id
                             function_calls[call_id] = {
                                 "name": event.item.name,
-                                "arguments": "",
+                                "arguments": event.item.arguments,
+                                "call_id": event.item.call_id or call_id,
                             }
+                            if deferring or not registry.is_read_only(event.item.name):
+                                deferring = True
+                            else:
+                                scheduler.submit(
+                                    call_id, event.item.name, event.item.arguments
+                                )
+                                dispatched.add(call_id)
+                    elif event.type == "response.completed":
+                        response_id = event.response.id
+            except BaseException:
+                scheduler.cancel()
+                raise
 
             # Signal end of reasoning if we had reasoning but no tool calls
             if has_reasoning:
@@ -128,9 +250,15 @@ async def chat(messages: list[InputMessage]) -> AsyncIterator[StreamEvent]:
             if not function_calls:
                 break
 
-            # Execute function calls and add to conversation for next iteration
+            # Execute the remaining calls (reads concurrently, writes serialized)
+            for call_id, call_info in function_calls.items():
+                if call_id not in dispatched:
+                    scheduler.submit(call_id, call_info["name"], call_info["arguments"])
+            results = dict(await scheduler.results())
+
+            # Add to conversation for next iteration, in the original call order
             for call_id, call_info in function_calls.items():
-                result = _execute_tool(call_info["name"], call_info["arguments"])
+                result = results[call_id]
 
                 # Emit tool call event
                 yield StreamEvent(
@@ -144,7 +272,7 @@ async def chat(messages: list[InputMessage]) -> AsyncIterator[StreamEvent]:
                 input_messages.append(
                     {
                         "type": "function_call",
-                        "call_id": call_id,
+                        "call_id": call_info["call_id"],
                         "name": call_info["name"],
                         "arguments": call_info["arguments"],
                     }
@@ -153,12 +281,32 @@ async def chat(messages: list[InputMessage]) -> AsyncIterator[StreamEvent]:
                 input_messages.append(
                     {
                         "type": "function_call_output",
-                        "call_id": call_id,
+                        "call_id": call_info["call_id"],
                         "output": result,
                     }
                 )
 
+            # A chained response already holds the calls; only send outputs
+            if RESPONSE_CHAINING and response_id:
+                previous_response_id = response_id
+                pending = [
+                    item
+                    for item in input_messages[round_start:]
+                    if item["type"] == "function_call_output"
+                ]
+            else:
+                previous_response_id = None
+
         # Yield final event with updated messages
-        yield StreamEvent(type="done", content="", messages=input_messages)
+        yield StreamEvent(
+            type="done",
+            content="",
+            messages=input_messages,
+            chain=(
+                ResponseChain(response_id, len(input_messages))
+                if RESPONSE_CHAINING and response_id
+                else None
+            ),
+        )
     except Exception as e:
         yield StreamEvent(type="error", content=str(e))
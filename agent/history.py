@@ -0,0 +1,143 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Any
+
+# Compact the history once its estimated size exceeds this many tokens
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "12000"))
+# Number of most recent user turns that are always kept verbatim
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "2"))
+
+# Compact down to this fraction of the budget so it doesn't re-trigger every turn
+_TARGET_RATIO = 0.75
+# Rough token estimate, good enough for budgeting without a tokenizer
+_CHARS_PER_TOKEN = 4
+# Tool outputs shorter than this are left untouched
+_MAX_OUTPUT_CHARS = 400
+
+
+@dataclass
+class CompactionStats:
+    """Result of compacting a conversation history."""
+
+    tokens_before: int
+    tokens_after: int
+    truncated_outputs: int = 0
+    dropped_items: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def estimate_tokens(item: Any) -> int:
+    """Estimate the prompt tokens used by a single history item."""
+    return len(json.dumps(item, ensure_ascii=False)) // _CHARS_PER_TOKEN + 4
+
+
+def _summarize_output(output: str) -> str:
+    """
+    Shrink a tool output to its scalar fields plus list sizes.
+
+    Keeps flags like found/success/error so the model still knows what
+    happened, while dropping bulky lists of medications or stock.
+    """
+    try:
+        data = json.loads(output)
+    except ValueError:
+        return json.dumps(
+            {"truncated": True, "summary": output[: _MAX_OUTPUT_CHARS // 2]}
+        )
+    if not isinstance(data, dict):
+        return json.dumps({"truncated": True})
+
+    summary: dict[str, Any] = {"truncated": True}
+    for key, value in data.items():
+        if isinstance(value, list):
+            summary[f"{key}_count"] = len(value)
+        elif not isinstance(value, dict):
+            summary[key] = value
+    return json.dumps(summary, ensure_ascii=False)
+
+
+def _recent_start(messages: list[Any], keep_turns: int) -> int:
+    """Index where the last `keep_turns` user turns begin."""
+    if keep_turns <= 0:
+        return len(messages)
+    seen = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].get("role") == "user":
+            seen += 1
+            if seen == keep_turns:
+                return index
+    return 0
+
+
+def compact_history(
+    messages: list[Any],
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+    keep_turns: int = HISTORY_KEEP_TURNS,
+) -> tuple[list[Any], CompactionStats]:
+    """
+    Compact a conversation history that has grown past the token budget.
+
+    The latest `keep_turns` user turns are kept verbatim. In older turns:
+    1. Reasoning items are dropped.
+    2. Large function_call_output payloads are replaced by a short summary.
+    3. If still over budget, the oldest tool call/output pairs are dropped.
+
+    User and assistant messages are never removed. Returns a new list
+    (the input is not modified) and statistics about what was saved.
+    """
+    sizes = [estimate_tokens(message) for message in messages]
+    before = sum(sizes)
+    stats = CompactionStats(tokens_before=before, tokens_after=before)
+    if before <= token_budget:
+        return messages, stats
+
+    target = int(token_budget * _TARGET_RATIO)
+    boundary = _recent_start(messages, keep_turns)
+    old = list(messages[:boundary])
+    old_sizes = sizes[:boundary]
+    total = before
+
+    # 1. Drop stale reasoning items
+    for index, item in enumerate(old):
+        if item is not None and item.get("type") == "reasoning":
+            total -= old_sizes[index]
+            old[index] = None
+            stats.dropped_items += 1
+
+    # 2. Summarize bulky tool outputs
+    for index, item in enumerate(old):
+        if item is None or item.get("type") != "function_call_output":
+            continue
+        output = item.get("output")
+        if not isinstance(output, str) or len(output) <= _MAX_OUTPUT_CHARS:
+            continue
+        compacted = {**item, "output": _summarize_output(output)}
+        new_size = estimate_tokens(compacted)
+        total -= old_sizes[index] - new_size
+        old[index], old_sizes[index] = compacted, new_size
+        stats.truncated_outputs += 1
+
+    # 3. Drop the oldest tool call/output pairs until under target
+    if total > target:
+        for index, item in enumerate(old):
+            if total <= target:
+                break
+            if item is None or item.get("type") != "function_call":
+                continue
+            call_id = item.get("call_id")
+            for pair_index in range(index, boundary):
+                pair = old[pair_index]
+                if pair is None or pair.get("call_id") != call_id:
+                    continue
+                if pair.get("type") in ("function_call", "function_call_output"):
+                    total -= old_sizes[pair_index]
+                    old[pair_index] = None
+                    stats.dropped_items += 1
+
+    stats.tokens_after = total
+    compacted_messages = [item for item in old if item is not None]
+    return compacted_messages + list(messages[boundary:]), stats
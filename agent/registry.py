@@ -0,0 +1,120 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import cast
+
+from openai.types.responses import ToolParam
+
+from db.connection import run_in_db_with_timeout
+
+from .tools import BaseTool
+
+# Seconds a read-only tool may run before the model gets a timeout error
+# instead of its result (0 disables). The abandoned call's queries are
+# aborted so it frees its DB thread and connection. Mutating tools are never
+# timed out, since a write that finishes after the model gave up could be
+# retried twice.
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """A registered tool with its precomputed schema and scheduling metadata."""
+
+    name: str
+    tool: type[BaseTool]
+    schema: ToolParam
+    # Read-only tools may run concurrently; mutating tools are serialized
+    read_only: bool
+    # Identical calls in one turn (with no write in between) share one result
+    cacheable: bool
+    # Seconds before a read-only call is abandoned (None: no limit)
+    timeout: float | None
+
+
+class ToolRegistry:
+    """
+    Tools available to the agent, keyed by name.
+
+    Everything derived from a tool class (name, JSON schema) is computed
+    once at registration, so each model round only reuses the frozen schema
+    list and each call is a dict lookup followed by the tool's own run().
+    """
+
+    def __init__(self) -> None:
+        self._specs: dict[str, ToolSpec] = {}
+        self._schemas: list[ToolParam] = []
+
+    def register(
+        self,
+        tool: type[BaseTool],
+        *,
+        read_only: bool | None = None,
+        cacheable: bool | None = None,
+        timeout: float | None = None,
+    ) -> ToolSpec:
+        """
+        Register a tool class.
+
+        `read_only` defaults to the class's read_only flag; read-only tools
+        are cacheable and get TOOL_TIMEOUT unless told otherwise.
+        """
+        name = tool.name()
+        if name in self._specs:
+            raise ValueError(f"Tool '{name}' is already registered")
+
+        read_only = tool.read_only if read_only is None else read_only
+        if cacheable is None:
+            cacheable = read_only
+        if not read_only and timeout is not None:
+            raise ValueError(f"Mutating tool '{name}' cannot have a timeout")
+        if timeout is None and read_only and TOOL_TIMEOUT > 0:
+            timeout = TOOL_TIMEOUT
+
+        spec = ToolSpec(
+            name=name,
+            tool=tool,
+            schema=cast(ToolParam, tool.to_openai_schema()),
+            read_only=read_only,
+            cacheable=cacheable,
+            timeout=timeout,
+        )
+        self._specs[name] = spec
+        self._schemas = [*self._schemas, spec.schema]
+        return spec
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def get(self, name: str) -> ToolSpec | None:
+        """Look up a registered tool by name."""
+        return self._specs.get(name)
+
+    def schemas(self) -> list[ToolParam]:
+        """OpenAI schemas for all registered tools (shared; do not mutate)."""
+        return self._schemas
+
+    def is_read_only(self, name: str) -> bool:
+        """Check whether a tool can safely run concurrently with other reads."""
+        spec = self._specs.get(name)
+        return spec.read_only if spec else True
+
+    def is_cacheable(self, name: str) -> bool:
+        """Check whether identical calls to a tool may share one result."""
+        spec = self._specs.get(name)
+        return spec.cacheable if spec else False
+
+    async def execute(self, name: str, arguments: str) -> str:
+        """Execute a tool by name on the DB executor, honoring its timeout."""
+        spec = self._specs.get(name)
+        if spec is None:
+            return json.dumps({"error": f"Unknown tool: {name}"})
+        try:
+            return await run_in_db_with_timeout(spec.timeout, spec.tool.run, arguments)
+        except TimeoutError:
+            return json.dumps(
+                {"error": f"Tool '{name}' timed out after {spec.timeout:g}s"}
+            )
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+
+
+class ToolScheduler:
+    """
+    Schedule a turn's tool calls so independent reads run concurrently.
+
+    Read-only calls start immediately (after any earlier mutating call has
+    finished). A mutating call waits for every call submitted before it, and
+    later calls wait for it, so writes keep the order the model asked for.
+    Results are always returned in submission order, one per call.
+
+    Repeated calls to a cacheable tool with identical arguments share the
+    first call's task, unless a mutating call was submitted in between.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[str, str], Awaitable[str]],
+        is_read_only: Callable[[str], bool],
+        is_cacheable: Callable[[str], bool] | None = None,
+    ):
+        self._execute = execute
+        self._is_read_only = is_read_only
+        self._is_cacheable = is_cacheable
+        self._calls: list[tuple[str, asyncio.Task[str]]] = []
+        self._last_write: asyncio.Task[str] | None = None
+        self._reads_since_write: list[asyncio.Task[str]] = []
+        # (name, arguments) -> task, for cacheable reads since the last write
+        self._cached: dict[tuple[str, str], asyncio.Task[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def _run(
+        self, after: list[asyncio.Task[str]], name: str, arguments: str
+    ) -> str:
+        """
+        Wait for dependencies, then execute.
+
+        A failing call (e.g. arguments that don't validate) gets an error
+        result instead of raising, so it never costs the other calls of the
+        turn their results.
+        """
+        if after:
+            await asyncio.wait(after)
+        try:
+            return await self._execute(name, arguments)
+        except Exception as e:
+            return json.dumps({"error": f"Tool '{name}' failed: {e}"})
+
+    def submit(self, call_id: str, name: str, arguments: str) -> None:
+        """Start a tool call in the background, respecting write ordering."""
+        if self._is_read_only(name):
+            key = (name, arguments)
+            cacheable = self._is_cacheable is not None and self._is_cacheable(name)
+            task = self._cached.get(key) if cacheable else None
+            if task is None:
+                after = [self._last_write] if self._last_write else []
+                task = asyncio.create_task(self._run(after, name, arguments))
+                self._reads_since_write.append(task)
+                if cacheable:
+                    self._cached[key] = task
+        else:
+            after = [self._last_write] if self._last_write else []
+            after += self._reads_since_write
+            task = asyncio.create_task(self._run(after, name, arguments))
+            self._last_write = task
+            self._reads_since_write = []
+            self._cached = {}
+        self._calls.append((call_id, task))
+
+    async def results(self) -> list[tuple[str, str]]:
+        """Wait for all submitted calls and return (call_id, result) in order."""
+        try:
+            outputs = await asyncio.gather(*(task for _, task in self._calls))
+        except BaseException:
+            self.cancel()
+            raise
+        return [(call_id, output) for (call_id, _), output in zip(self._calls, outputs)]
+
+    def cancel(self) -> None:
+        """Cancel any calls that are still running."""
+        for _, task in self._calls:
+            task.cancel()
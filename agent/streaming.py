@@ -0,0 +1,118 @@
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, replace
+from typing import Any
+
+# Merge adjacent deltas arriving within this window (0 disables coalescing)
+STREAM_COALESCE_MS = float(os.getenv("STREAM_COALESCE_MS", "30"))
+# Flush a merged delta once it reaches this many bytes
+STREAM_COALESCE_BYTES = int(os.getenv("STREAM_COALESCE_BYTES", "256"))
+
+# Event types whose content can be concatenated
+MERGEABLE_TYPES = frozenset({"reasoning", "text"})
+
+
+@dataclass
+class CoalesceStats:
+    """Counters for the delta coalescing layer."""
+
+    received: int = 0
+    emitted: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """Events received per event emitted."""
+        return self.received / self.emitted if self.emitted else 0.0
+
+
+# Process-wide counters across all sessions
+stats = CoalesceStats()
+
+
+async def coalesce[E: Any](
+    events: AsyncIterator[E],
+    window_ms: float = STREAM_COALESCE_MS,
+    max_bytes: int = STREAM_COALESCE_BYTES,
+    counters: CoalesceStats = stats,
+) -> AsyncIterator[E]:
+    """
+    Merge adjacent "reasoning"/"text" deltas of the same type.
+
+    A merged delta is flushed when an event of another type arrives (so
+    event type ordering is preserved), when it reaches `max_bytes`, or when
+    `window_ms` has passed since its first delta, even if the source is
+    still waiting on the next event.
+    """
+    if window_ms <= 0:
+        async for event in events:
+            counters.received += 1
+            counters.emitted += 1
+            yield event
+        return
+
+    window = window_ms / 1000
+    loop = asyncio.get_running_loop()
+    iterator = aiter(events)
+    buffered: E | None = None
+    parts: list[str] = []
+    size = 0
+    deadline = 0.0
+
+    def flush() -> E:
+        nonlocal buffered, parts, size
+        merged = replace(buffered, content="".join(parts))
+        buffered, parts, size = None, [], 0
+        counters.emitted += 1
+        return merged
+
+    pending: asyncio.Task[E] | None = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator))
+
+            if buffered is not None:
+                timeout = max(deadline - loop.time(), 0)
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    yield flush()
+                    continue
+
+            try:
+                event = await pending
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+            counters.received += 1
+
+            if buffered is not None and event.type == buffered.type:
+                parts.append(event.content)
+                size += len(event.content.encode())
+                if size >= max_bytes:
+                    yield flush()
+                continue
+
+            if buffered is not None:
+                yield flush()
+
+            if event.type in MERGEABLE_TYPES:
+                buffered, parts = event, [event.content]
+                size = len(event.content.encode())
+                deadline = loop.time() + window
+                if size >= max_bytes:
+                    yield flush()
+            else:
+                counters.emitted += 1
+                yield event
+
+        if buffered is not None:
+            yield flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.wait({pending})
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -1,16 +1,29 @@
 import json
-from typing import Any
+from typing import Any, ClassVar
 
 from pydantic import BaseModel, Field
 
-from db import medications, prescriptions, stock, users
-from db.connection import get_connection
-from db.models.dosage import calculate_equivalent_months
+from db import (
+    cards,
+    equivalence,
+    fuzzy,
+    medications,
+    prescriptions,
+    reservations,
+    stock,
+    users,
+)
+from db.models.dosage import calculate_equivalent_months, parse_mg, parse_unit_family
+from db.models.packs import solve_pack_combination
+from db.repositories.reservations import ReservationLine
 
 
 class BaseTool(BaseModel):
     """Base class for all tools. Subclass and implement execute()."""
 
+    # Read-only tools may run concurrently; mutating tools are serialized
+    read_only: ClassVar[bool] = False
+
     @classmethod
     def name(cls) -> str:
         """Tool name derived from class name."""
@@ -45,51 +58,166 @@ class BaseTool(BaseModel):
     @classmethod
     def run(cls, arguments: str) -> str:
         """Parse JSON arguments, execute, and return JSON result."""
-        args = json.loads(arguments)
-        instance = cls(**args)
+        instance = cls.model_validate_json(arguments)
         result = instance.execute()
         return json.dumps(result)
 
 
+def _stock_summary(items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Dosage and quantity of card stock entries, for tool output."""
+    return [{"dosage": s["dosage"], "quantity": s["quantity"]} for s in items]
+
+
+def _alternative_summary(
+    alt: dict[str, Any], stock_items: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Tool output for an in-stock alternative (see equivalence) and its stock."""
+    info: dict[str, Any] = {
+        "name": alt["name_en"],
+        "name_he": alt["name_he"],
+        "relation": alt["relation"],
+        "requires_prescription": alt["requires_prescription"],
+        "price": alt["price"],
+        "available_stock": _stock_summary(stock_items),
+    }
+    if alt["missing"]:
+        info["missing_ingredients"] = alt["missing"]
+    if alt["extra"]:
+        info["extra_ingredients"] = alt["extra"]
+    return info
+
+
 class GetMedicationStock(BaseTool):
-    """Get stock info for a medication by name. Returns all available dosages and quantities (in monthly packs)."""
+    """Get stock info for a medication by name. Returns all available dosages and quantities (in monthly packs), plus in-stock alternatives with the same or overlapping active ingredients."""
+
+    read_only = True
 
     medication_name: str = Field(description="The name of the medication to check")
 
     def execute(self) -> dict[str, Any]:
-        # Look up medication by name (with ingredients for alternative suggestions)
-        med = medications.get_by_name(self.medication_name, include_ingredients=True)
-        if not med:
+        # Catalog fields, ingredients and stock levels in one precomputed card
+        card = cards.get_by_name(self.medication_name)
+        if not card:
             return {
                 "medication_name": self.medication_name,
                 "found": False,
                 "error": f"Medication '{self.medication_name}' not found in catalogue",
+                "did_you_mean": fuzzy.suggest_medications(self.medication_name),
             }
 
-        # Check stock availability
-        availability = stock.check_availability(med.id)
-
         # Get in-stock items
-        in_stock_items = [s for s in availability.alternatives if s.quantity > 0]
+        in_stock_items = [s for s in card["stock"] if s["quantity"] > 0]
 
         return {
-            "medication_name": med.name_en,
-            "medication_name_he": med.name_he,
+            "medication_name": card["name_en"],
+            "medication_name_he": card["name_he"],
             "found": True,
-            "description": med.description_en,
-            "requires_prescription": med.requires_prescription,
-            "price": med.price,
+            "description": card["description_en"],
+            "requires_prescription": card["requires_prescription"],
+            "price": card["price"],
             "in_stock": len(in_stock_items) > 0,
-            "active_ingredients": [ing.name_en for ing in med.ingredients],
-            "available_stock": [
-                {"dosage": s.dosage, "quantity": s.quantity} for s in in_stock_items
+            "active_ingredients": [ing["name_en"] for ing in card["ingredients"]],
+            "available_stock": _stock_summary(in_stock_items),
+            # Substitutes from the precomputed ingredient-equivalence graph
+            "in_stock_alternatives": [
+                _alternative_summary(alt, alt["stock"])
+                for alt in equivalence.get_in_stock_alternatives(card["id"])
             ],
         }
 
 
+class CheckMedicationAvailability(BaseTool):
+    """Check if a medication (optionally a specific dosage) is available, in one call.
+
+    Returns whether the requested dosage is in stock, the other in-stock dosages
+    of the same medication (closest strength first), and in-stock substitutes with
+    exactly the same active ingredients. Use this for availability questions
+    instead of chaining get_medication_stock and get_medications_by_ingredient.
+    """
+
+    read_only = True
+
+    medication_name: str = Field(description="The name of the medication to check")
+    dosage: str | None = Field(
+        default=None,
+        description="Optional requested dosage (e.g., '500mg'). If not provided, any dosage counts as a match.",
+    )
+
+    def _matches(self, item: dict[str, Any]) -> bool:
+        """Whether a card stock entry is the requested dosage."""
+        if not self.dosage:
+            return True
+        target_mg = parse_mg(self.dosage)
+        if target_mg is not None and item["strength_mg"] is not None:
+            return item["strength_mg"] == target_mg and item[
+                "unit_family"
+            ] == parse_unit_family(self.dosage)
+        return (item["dosage"] or "").replace(" ", "").lower() == self.dosage.replace(
+            " ", ""
+        ).lower()
+
+    def _closest_first(self, items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """In-stock card entries ordered by closeness to the requested strength."""
+        target_mg = parse_mg(self.dosage) if self.dosage else None
+        family = parse_unit_family(self.dosage) if self.dosage else None
+
+        def key(item: dict[str, Any]) -> tuple:
+            distance = (
+                abs(item["strength_mg"] - target_mg)
+                if item["strength_mg"] is not None and target_mg is not None
+                else 0.0
+            )
+            return (
+                family is not None and item["unit_family"] != family,
+                item["strength_mg"] is None,
+                distance,
+            )
+
+        return sorted((s for s in items if s["quantity"] > 0), key=key)
+
+    def execute(self) -> dict[str, Any]:
+        card = cards.get_by_name(self.medication_name)
+        if not card:
+            return {
+                "medication_name": self.medication_name,
+                "found": False,
+                "error": f"Medication '{self.medication_name}' not found in catalogue",
+                "did_you_mean": fuzzy.suggest_medications(self.medication_name),
+            }
+
+        in_stock_items = self._closest_first(card["stock"])
+        exact = [s for s in in_stock_items if self._matches(s)]
+        other_dosages = [s for s in in_stock_items if not self._matches(s)]
+
+        substitutes = []
+        for alt in equivalence.get_in_stock_alternatives(card["id"], {"same"}):
+            alt_stock = self._closest_first(alt["stock"])
+            substitute = _alternative_summary(alt, alt_stock)
+            substitute["requested_dosage_in_stock"] = any(
+                self._matches(s) for s in alt_stock
+            )
+            substitutes.append(substitute)
+
+        return {
+            "medication_name": card["name_en"],
+            "medication_name_he": card["name_he"],
+            "found": True,
+            "requires_prescription": card["requires_prescription"],
+            "price": card["price"],
+            "active_ingredients": [ing["name_en"] for ing in card["ingredients"]],
+            "requested_dosage": self.dosage,
+            "in_stock": len(exact) > 0,
+            "available_stock": _stock_summary(exact),
+            "other_dosages_in_stock": _stock_summary(other_dosages),
+            "substitutes_in_stock": substitutes,
+        }
+
+
 class GetDosageInstructions(BaseTool):
     """Get dosage and usage instructions for a medication. Returns adult/child doses, frequency, max daily dose, and warnings."""
 
+    read_only = True
+
     medication_name: str = Field(description="The name of the medication")
     dosage: str | None = Field(
         default=None,
@@ -103,6 +231,7 @@ class GetDosageInstructions(BaseTool):
                 "medication_name": self.medication_name,
                 "found": False,
                 "error": f"Medication '{self.medication_name}' not found in catalogue",
+                "did_you_mean": fuzzy.suggest_medications(self.medication_name),
             }
 
         instructions = medications.get_dosage_instructions(med.id, self.dosage)
@@ -135,6 +264,8 @@ class GetDosageInstructions(BaseTool):
 class GetMedicationsByIngredient(BaseTool):
     """Get medications containing an ingredient. Returns stock availability (in monthly packs) for each."""
 
+    read_only = True
+
     ingredient_name: str = Field(
         description="The name of the active ingredient to search for"
     )
@@ -150,12 +281,15 @@ class GetMedicationsByIngredient(BaseTool):
                 "found": False,
                 "count": 0,
                 "medications": [],
+                "did_you_mean": fuzzy.suggest_ingredients(self.ingredient_name),
             }
 
+        # Stock availability for all matches in a single query
+        availability_by_id = stock.check_availability_bulk(med.id for med in results)
+
         medication_list = []
         for med in results:
-            # Get stock availability
-            availability = stock.check_availability(med.id)
+            availability = availability_by_id[med.id]
             in_stock_items = [s for s in availability.alternatives if s.quantity > 0]
 
             # Find extra ingredients (besides the searched one)
@@ -193,6 +327,8 @@ class GetMedicationsByIngredient(BaseTool):
 class LoadPrescriptions(BaseTool):
     """Load all active prescriptions for a user by their 4-digit PIN."""
 
+    read_only = True
+
     pin: str = Field(description="The user's 4-digit PIN")
 
     def execute(self) -> dict[str, Any]:
@@ -239,6 +375,112 @@ class LoadPrescriptions(BaseTool):
         }
 
 
+class PlanPrescriptionFill(BaseTool):
+    """Plan the packs that fill a prescription, using live stock of every dosage.
+
+    Finds the combination with the fewest (and therefore cheapest) packs whose
+    prescription months add up exactly to the months wanted, applying the same
+    dosage-equivalence rules (25% rounding tolerance) as reserve_medications.
+    Mixed dosages are allowed, e.g. 10mg and 40mg packs for a 20mg prescription.
+
+    Does not reserve anything: pass the returned reserve_request to
+    reserve_medications once the user confirms (required if the plan uses a
+    dosage other than the prescribed one).
+    """
+
+    read_only = True
+
+    user_pin: str = Field(description="The user's 4-digit PIN (required)")
+    prescription_id: int = Field(description="The prescription to fill")
+    months: int = Field(description="Number of prescription months to fill", gt=0)
+
+    def execute(self) -> dict[str, Any]:
+        user_prescriptions = prescriptions.get_by_user_pin(
+            self.user_pin, active_only=True, include_medication=True
+        )
+        rx = next((p for p in user_prescriptions if p.id == self.prescription_id), None)
+        if not rx or not rx.medication:
+            return {
+                "success": False,
+                "error": (
+                    f"No active prescription {self.prescription_id} "
+                    f"for PIN '{self.user_pin}'"
+                ),
+            }
+
+        med = rx.medication
+        if not rx.dosage:
+            return {
+                "success": False,
+                "error": f"Prescription {rx.id} has no dosage to plan against",
+            }
+        if self.months > rx.months_remaining:
+            return {
+                "success": False,
+                "error": (
+                    f"Requested {self.months} month(s), but only "
+                    f"{rx.months_remaining} month(s) remaining on prescription"
+                ),
+            }
+
+        in_stock = stock.get_by_strength(
+            med.id, unit_family=rx.unit_family or "mg", in_stock_only=True
+        )
+        plan = solve_pack_combination(
+            rx.dosage,
+            self.months,
+            [(s.dosage, s.quantity) for s in in_stock if s.dosage],
+        )
+        if not plan:
+            return {
+                "success": False,
+                "error": (
+                    f"Cannot fill {self.months} month(s) of {med.name_en} "
+                    f"{rx.dosage} from current stock within the 25% tolerance"
+                ),
+                "in_stock": [
+                    {"dosage": s.dosage, "quantity": s.quantity} for s in in_stock
+                ],
+            }
+
+        packs = [
+            {
+                "dosage": line.dosage,
+                "quantity": line.quantity,
+                "months_consumed_from_prescription": line.months,
+                "unit_price": med.price,
+                "total_price": (med.price or 0.0) * line.quantity,
+            }
+            for line in plan.lines
+        ]
+        return {
+            "success": True,
+            "prescription_id": rx.id,
+            "medication_name": med.name_en,
+            "medication_name_he": med.name_he,
+            "prescribed_dosage": rx.dosage,
+            "months": plan.months,
+            "months_remaining_after": rx.months_remaining - plan.months,
+            "uses_prescribed_dosage_only": all(
+                line.dosage == rx.dosage for line in plan.lines
+            ),
+            "packs": packs,
+            "total_packs": plan.total_packs,
+            "total_price": (med.price or 0.0) * plan.total_packs,
+            "reserve_request": {
+                "user_pin": self.user_pin,
+                "medications": [
+                    {
+                        "medication_name": med.name_en,
+                        "dosage": line.dosage,
+                        "quantity": line.quantity,
+                    }
+                    for line in plan.lines
+                ],
+            },
+        }
+
+
 class MedicationToReserve(BaseModel):
     """A single medication to reserve with dosage and quantity (in monthly packs)."""
 
@@ -281,8 +523,8 @@ class ReserveMedications(BaseTool):
             }
 
         # 2. Get all active prescriptions for the user
-        user_prescriptions = prescriptions.get_by_user_pin(
-            self.user_pin, active_only=True, include_medication=True
+        user_prescriptions = prescriptions.get_by_user_id(
+            user.id, active_only=True, include_medication=True
         )
 
         # Build a lookup: medication_id -> prescription
@@ -294,13 +536,28 @@ class ReserveMedications(BaseTool):
         validated_items: list[dict[str, Any]] = []
         errors: list[str] = []
 
+        # Resolve all medications, then load their stock in a single query
+        meds_by_name = {
+            med_request.medication_name: medications.get_by_name(
+                med_request.medication_name
+            )
+            for med_request in self.medications
+        }
+        stock_by_med_id = stock.check_availability_bulk(
+            med.id for med in meds_by_name.values() if med
+        )
+
         for med_request in self.medications:
             # Find the medication
-            med = medications.get_by_name(med_request.medication_name)
+            med = meds_by_name[med_request.medication_name]
             if not med:
-                errors.append(
+                error = (
                     f"Medication '{med_request.medication_name}' not found in catalogue"
                 )
+                candidates = fuzzy.suggest_medications(med_request.medication_name)
+                if candidates:
+                    error += f" (did you mean: {', '.join(candidates)}?)"
+                errors.append(error)
                 continue
 
             # Check if user has an active prescription for this medication
@@ -341,14 +598,20 @@ class ReserveMedications(BaseTool):
                     continue
 
             # Check stock availability
-            stock_items = stock.get_by_medication_id(med.id, med_request.dosage)
-            if not stock_items:
+            stock_item = next(
+                (
+                    s
+                    for s in stock_by_med_id[med.id].alternatives
+                    if s.dosage == med_request.dosage
+                ),
+                None,
+            )
+            if not stock_item:
                 errors.append(
                     f"'{med_request.medication_name}' {med_request.dosage} not in stock"
                 )
                 continue
 
-            stock_item = stock_items[0]
             if stock_item.quantity < med_request.quantity:
                 errors.append(
                     f"Insufficient stock for '{med_request.medication_name}' "
@@ -382,85 +645,88 @@ class ReserveMedications(BaseTool):
                 "error": "No medications to reserve",
             }
 
-        # 4. Execute all updates in a transaction
-        conn = get_connection()
-        try:
-            cursor = conn.cursor()
-
-            reserved_details: list[dict[str, Any]] = []
-            total_reservation_price = 0.0
-
-            for item in validated_items:
-                stock_item = item["stock_item"]
-                rx = item["prescription"]
-                med = item["medication"]
-
-                # Decrement stock
-                cursor.execute(
-                    "UPDATE stock SET quantity = quantity - ?, "
-                    "updated_at = datetime('now') WHERE id = ?",
-                    (item["quantity"], stock_item.id),
+        # 4. Apply all updates atomically; stock and prescription months are
+        # re-checked under the write lock, so concurrent reservations cannot
+        # oversell even if they passed validation at the same time
+        result = reservations.reserve(
+            [
+                ReservationLine(
+                    stock_id=item["stock_item"].id,
+                    quantity=item["quantity"],
+                    prescription_id=item["prescription"].id
+                    if item["prescription"]
+                    else None,
+                    months=item["effective_months"] or 0,
                 )
-
-                # Increment prescription months_fulfilled by effective months consumed
-                # Only for prescription medications
-                if rx:
-                    cursor.execute(
-                        "UPDATE prescriptions SET months_fulfilled = months_fulfilled + ? "
-                        "WHERE id = ?",
-                        (item["effective_months"], rx.id),
+                for item in validated_items
+            ]
+        )
+        if not result.success:
+            if result.error:
+                return {"success": False, "error": result.error}
+            errors = []
+            for item, line in zip(validated_items, result.lines):
+                if line.error is None:
+                    continue
+                name = f"'{item['medication'].name_en}' {item['dosage']}"
+                if line.months_remaining is not None:
+                    errors.append(
+                        f"Cannot reserve {name}: only {line.months_remaining} "
+                        f"month(s) remaining on prescription"
                     )
+                else:
+                    errors.append(
+                        f"Insufficient stock for {name}: requested "
+                        f"{item['quantity']}, available {line.available}"
+                    )
+            return {"success": False, "errors": errors}
 
-                # Get dosage instructions for the reserved dosage
-                dosage_instructions = medications.get_dosage_instructions(
-                    med.id, item["dosage"]
-                )
+        reserved_details: list[dict[str, Any]] = []
+        total_reservation_price = 0.0
 
-                item_total_price = (med.price or 0.0) * item["quantity"]
-                total_reservation_price += item_total_price
+        for item in validated_items:
+            rx = item["prescription"]
+            med = item["medication"]
 
-                reserved_item: dict[str, Any] = {
-                    "medication_name": med.name_en,
-                    "medication_name_he": med.name_he,
-                    "dosage": item["dosage"],
-                    "quantity": item["quantity"],
-                    "unit_price": med.price,
-                    "total_price": item_total_price,
-                }
+            # Get dosage instructions for the reserved dosage
+            dosage_instructions = medications.get_dosage_instructions(
+                med.id, item["dosage"]
+            )
 
-                # Include prescription info only if applicable
-                if rx:
-                    reserved_item["prescription_id"] = rx.id
-                    reserved_item["prescribed_dosage"] = rx.dosage
-                    reserved_item["months_consumed_from_prescription"] = item[
-                        "effective_months"
-                    ]
-                    reserved_item["months_remaining_on_prescription"] = (
-                        rx.months_remaining - item["effective_months"]
-                    )
-                    # Add note if dosage differs from prescription
-                    if item["dosage"] != rx.dosage:
-                        reserved_item["dosage_note"] = (
-                            f"Reserved {item['quantity']} pack(s) of {item['dosage']} "
-                            f"to fulfill {item['effective_months']} month(s) of "
-                            f"{rx.dosage} prescription"
-                        )
+            item_total_price = (med.price or 0.0) * item["quantity"]
+            total_reservation_price += item_total_price
 
-                if dosage_instructions:
-                    reserved_item["usage"] = dosage_instructions[0]
+            reserved_item: dict[str, Any] = {
+                "medication_name": med.name_en,
+                "medication_name_he": med.name_he,
+                "dosage": item["dosage"],
+                "quantity": item["quantity"],
+                "unit_price": med.price,
+                "total_price": item_total_price,
+            }
 
-                reserved_details.append(reserved_item)
+            # Include prescription info only if applicable
+            if rx:
+                reserved_item["prescription_id"] = rx.id
+                reserved_item["prescribed_dosage"] = rx.dosage
+                reserved_item["months_consumed_from_prescription"] = item[
+                    "effective_months"
+                ]
+                reserved_item["months_remaining_on_prescription"] = (
+                    rx.months_remaining - item["effective_months"]
+                )
+                # Add note if dosage differs from prescription
+                if item["dosage"] != rx.dosage:
+                    reserved_item["dosage_note"] = (
+                        f"Reserved {item['quantity']} pack(s) of {item['dosage']} "
+                        f"to fulfill {item['effective_months']} month(s) of "
+                        f"{rx.dosage} prescription"
+                    )
 
-            conn.commit()
+            if dosage_instructions:
+                reserved_item["usage"] = dosage_instructions[0]
 
-        except Exception as e:
-            conn.rollback()
-            return {
-                "success": False,
-                "error": f"Transaction failed: {str(e)}",
-            }
-        finally:
-            conn.close()
+            reserved_details.append(reserved_item)
 
         return {
             "success": True,
@@ -0,0 +1 @@
+"""Ad hoc benchmarks; run each module with `uv run python -m benchmarks.<name>`."""
@@ -0,0 +1,128 @@
+"""
+Model rounds and wall time to answer availability questions.
+
+Runs the agent loop against the fake streaming Responses server (see
+tests/fake_responses.py) with a fixed per-round latency, once with a
+scripted model that uses the composite check_medication_availability tool
+and once with one that chains get_medication_stock and, when the requested
+dosage is missing, get_medications_by_ingredient. Each scenario asks for a
+medication and dosage from the seeded catalog.
+
+    uv run python -m benchmarks.bench_agent_rounds [--latency 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any
+
+from openai import AsyncOpenAI
+
+from benchmarks.common import temp_database
+from tests.fake_responses import FakeResponsesServer, FunctionCall, Turn
+
+# The agent package creates its OpenAI client on import; it is replaced below
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+from agent import agent
+
+SCENARIOS = [
+    ("Acamol", "500mg"),
+    ("Advil", "400mg"),
+    ("Losec", "20mg"),
+    ("Lipitor", "20mg"),
+    ("Claritine", "10mg"),
+    ("Norvasc", "5mg"),
+    ("Moxypen", "500mg"),
+    ("Glucophage", "850mg"),
+]
+
+
+def _tool_outputs(conversation: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Tool name -> parsed output, for the calls made so far this turn."""
+    names = {
+        item["call_id"]: item["name"]
+        for item in conversation
+        if item.get("type") == "function_call"
+    }
+    return {
+        names[item["call_id"]]: json.loads(item["output"])
+        for item in conversation
+        if item.get("type") == "function_call_output"
+    }
+
+
+def composite_policy(conversation: list[dict[str, Any]]) -> Turn:
+    """One check_medication_availability call, then answer."""
+    if "check_medication_availability" in _tool_outputs(conversation):
+        return "answer"
+    question = json.loads(conversation[0]["content"])
+    return [FunctionCall("check_medication_availability", question)]
+
+
+def chained_policy(conversation: list[dict[str, Any]]) -> Turn:
+    """Stock lookup, then an ingredient search if the dosage is missing."""
+    question = json.loads(conversation[0]["content"])
+    outputs = _tool_outputs(conversation)
+    stock = outputs.get("get_medication_stock")
+    if stock is None:
+        return [
+            FunctionCall(
+                "get_medication_stock", {"medication_name": question["medication_name"]}
+            )
+        ]
+    dosage_in_stock = any(
+        s["dosage"] == question["dosage"] for s in stock.get("available_stock", [])
+    )
+    if (
+        stock["found"]
+        and not dosage_in_stock
+        and "get_medications_by_ingredient" not in outputs
+    ):
+        return [
+            FunctionCall(
+                "get_medications_by_ingredient",
+                {"ingredient_name": stock["active_ingredients"][0]},
+            )
+        ]
+    return "answer"
+
+
+async def _run(server: FakeResponsesServer) -> float:
+    """Answer every scenario; return the wall time in seconds."""
+    agent.client = AsyncOpenAI(base_url=server.base_url, api_key="unused")
+    began = time.perf_counter()
+    for name, dosage in SCENARIOS:
+        question = json.dumps({"medication_name": name, "dosage": dosage})
+        async for event in agent.chat([{"role": "user", "content": question}]):
+            if event.type == "error":
+                raise RuntimeError(event.content)
+    return time.perf_counter() - began
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="seconds per model round"
+    )
+    args = parser.parse_args()
+
+    with temp_database():
+        for label, policy in [
+            ("get_medication_stock + get_medications_by_ingredient", chained_policy),
+            ("check_medication_availability", composite_policy),
+        ]:
+            with FakeResponsesServer(policy, latency=args.latency) as server:
+                wall = asyncio.run(_run(server))
+            rounds = len(server.requests)
+            print(
+                f"{label}: {rounds} model rounds over {len(SCENARIOS)} scenarios, "
+                f"{wall:.2f} s wall ({wall - rounds * args.latency:.3f} s excluding "
+                "model latency)"
+            )
+
+
+if __name__ == "__main__":
+    main()
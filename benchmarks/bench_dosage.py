@@ -0,0 +1,99 @@
+"""
+Dosage engine microbenchmark over 1M (requested, prescribed) dosage pairs.
+
+Times calculate_equivalent_months per pair with the parse cache bypassed,
+per pair with it, and through calculate_equivalent_months_batch with the
+pairs grouped by prescribed dosage (as the tools evaluate every stock row
+against one prescription). All three must agree.
+
+    uv run python -m benchmarks.bench_dosage [--pairs 1000000]
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from db.models import dosage
+
+DOSAGES = [
+    "5mg",
+    "10mg",
+    "20mg",
+    "40mg",
+    "80mg",
+    "250mg",
+    "500mg",
+    "0.5g",
+    "1g",
+    "100mcg",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pairs", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pairs = [
+        (rng.choice(DOSAGES), rng.randint(1, 24), rng.choice(DOSAGES))
+        for _ in range(args.pairs)
+    ]
+
+    # Same parsing, minus the memoization
+    memoized = dosage.parse_mg
+    dosage.parse_mg = memoized.__wrapped__
+    try:
+        began = time.perf_counter()
+        unmemoized = [dosage.calculate_equivalent_months(r, q, p) for r, q, p in pairs]
+        unmemoized_s = time.perf_counter() - began
+    finally:
+        dosage.parse_mg = memoized
+
+    dosage.parse_mg.cache_clear()
+    began = time.perf_counter()
+    per_pair = [dosage.calculate_equivalent_months(r, q, p) for r, q, p in pairs]
+    per_pair_s = time.perf_counter() - began
+
+    # Grouping is timed apart: the tools already hold one prescription's rows
+    began = time.perf_counter()
+    groups: dict[str, tuple[list[str], list[int], list[int]]] = defaultdict(
+        lambda: ([], [], [])
+    )
+    for index, (requested, quantity, prescribed) in enumerate(pairs):
+        dosages, quantities, indexes = groups[prescribed]
+        dosages.append(requested)
+        quantities.append(quantity)
+        indexes.append(index)
+    grouping_s = time.perf_counter() - began
+
+    dosage.parse_mg.cache_clear()
+    began = time.perf_counter()
+    batched: list[int | None] = [None] * len(pairs)
+    for prescribed, (dosages, quantities, indexes) in groups.items():
+        months = dosage.calculate_equivalent_months_batch(
+            dosages, quantities, prescribed
+        )
+        for index, value in zip(indexes, months):
+            batched[index] = value
+    batched_s = time.perf_counter() - began
+
+    if not unmemoized == per_pair == batched:
+        raise SystemExit("results differ between the three paths")
+
+    print(f"{args.pairs:,} pairs (results identical)")
+    print(f"per pair, unmemoized: {unmemoized_s:.2f}s")
+    print(
+        f"per pair, memoized:   {per_pair_s:.2f}s  ({unmemoized_s / per_pair_s:.1f}x)"
+    )
+    print(
+        f"batched:              {batched_s:.2f}s  ({unmemoized_s / batched_s:.1f}x), "
+        f"plus {grouping_s:.2f}s grouping pairs by prescription"
+    )
+    print(f"parse cache: {dosage.parse_mg.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
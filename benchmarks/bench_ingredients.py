@@ -0,0 +1,120 @@
+"""
+Ingredient loading for multi-row medication lookups: one query per row
+versus one batched query.
+
+Adds `--size` synthetic medications sharing one ingredient to the seed
+catalog, then loads them all with their ingredients both ways, with the
+catalog cache cleared before every run.
+
+    uv run python -m benchmarks.bench_ingredients [--size 500] [--repeat 20]
+"""
+
+import argparse
+import sqlite3
+import statistics
+import time
+from collections.abc import Callable
+
+from db import connection
+from db.migrations import fill_name_keys
+from db.repositories import medications
+
+from .common import temp_database
+
+INGREDIENT = "Benchmarkol"
+
+
+def _add_catalog(size: int) -> None:
+    """Add `size` medications containing INGREDIENT plus one ingredient of their own."""
+    conn = connection.get_connection()
+    try:
+        ingredient_id = conn.execute(
+            "INSERT INTO ingredients (name_en) VALUES (?)", (INGREDIENT,)
+        ).lastrowid
+        for i in range(size):
+            medication_id = conn.execute(
+                "INSERT INTO medications (name_en, price) VALUES (?, 10)",
+                (f"Bench Medication {i:05d}",),
+            ).lastrowid
+            own_id = conn.execute(
+                "INSERT INTO ingredients (name_en) VALUES (?)",
+                (f"Bench Extra {i:05d}",),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO medication_ingredients (medication_id, ingredient_id) "
+                "VALUES (?, ?)",
+                [(medication_id, ingredient_id), (medication_id, own_id)],
+            )
+        fill_name_keys(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    # Merge the per-row FTS segments, as after any bulk catalog load
+    medications.rebuild_search_index()
+
+
+def _per_row() -> list[medications.Medication]:
+    """Load matches, then each one's ingredients separately (the old N+1 path)."""
+    found = medications.get_by_ingredient(INGREDIENT)
+    for med in found:
+        med.ingredients = medications._get_ingredients_for_medication(med.id)
+    return found
+
+
+def _batched() -> list[medications.Medication]:
+    """Load matches and all their ingredients in one extra query."""
+    return medications.get_by_ingredient(INGREDIENT, include_ingredients=True)
+
+
+def _measure(
+    load: Callable[[], list[medications.Medication]], repeat: int, statements: list[str]
+) -> tuple[float, int, int]:
+    """Median milliseconds, queries per run, and medications found."""
+    timings: list[float] = []
+    for _ in range(repeat):
+        medications.clear_cache()
+        statements.clear()
+        began = time.perf_counter()
+        found = load()
+        timings.append((time.perf_counter() - began) * 1000)
+        assert all(len(med.ingredients) == 2 for med in found)
+    # Nested statements (FTS5 reading its own tables) are prefixed with "--";
+    # "SELECT 1" is the pool's health check
+    queries = sum(
+        1
+        for sql in statements
+        if not sql.startswith(("--", "PRAGMA")) and sql != "SELECT 1"
+    )
+    return statistics.median(timings), queries, len(found)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=500, help="matching medications")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_database():
+        _add_catalog(args.size)
+
+        # Record the statements run on pooled connections
+        statements: list[str] = []
+        get_connection = connection.get_connection
+
+        def traced(read_only: bool = False) -> sqlite3.Connection:
+            conn = get_connection(read_only)
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        connection.close_pool()
+        connection.get_connection = traced
+        try:
+            for name, load in (("per row", _per_row), ("batched", _batched)):
+                ms, queries, found = _measure(load, args.repeat, statements)
+                print(f"{name}: {found} medications, {queries} queries, {ms:.1f} ms")
+        finally:
+            connection.get_connection = get_connection
+
+
+if __name__ == "__main__":
+    main()
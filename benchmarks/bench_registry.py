@@ -0,0 +1,118 @@
+"""
+Tool registry overhead with 50 registered tools.
+
+The app's tools are padded with synthetic ones to 50. Compares the
+per-round and per-call work of rebuilding every schema and scanning tool
+names (the pre-registry agent loop) with the registry's frozen schema list
+and name lookup, and times registration and a full registry dispatch.
+
+    uv run python -m benchmarks.bench_registry [--tools 50]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections.abc import Callable
+from typing import Any
+
+from pydantic import Field, create_model
+
+# The agent package creates its OpenAI client on import; nothing here calls it
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+from agent.registry import ToolRegistry
+from agent.tools import (
+    BaseTool,
+    CheckMedicationAvailability,
+    GetDosageInstructions,
+    GetMedicationsByIngredient,
+    GetMedicationStock,
+    LoadPrescriptions,
+    PlanPrescriptionFill,
+    ReserveMedications,
+)
+
+APP_TOOLS: list[type[BaseTool]] = [
+    CheckMedicationAvailability,
+    GetMedicationStock,
+    GetMedicationsByIngredient,
+    GetDosageInstructions,
+    LoadPrescriptions,
+    PlanPrescriptionFill,
+    ReserveMedications,
+]
+ARGUMENTS = '{"medication_name": "Advil", "dosage": "200mg", "months": 2}'
+
+
+def _synthetic_tool(number: int) -> type[BaseTool]:
+    """A read-only tool with a few typed arguments that touches no database."""
+
+    def execute(self: BaseTool) -> dict[str, Any]:
+        return {"ok": True}
+
+    tool = create_model(
+        f"SyntheticTool{number:02d}",
+        __base__=BaseTool,
+        __doc__=f"Synthetic tool {number} for benchmarking the registry.",
+        medication_name=(str, Field(description="Medication name")),
+        dosage=(str | None, Field(default=None, description="Dosage, e.g. 500mg")),
+        months=(int, Field(default=1, gt=0, description="Months to supply")),
+    )
+    tool.execute = execute
+    tool.read_only = True
+    return tool
+
+
+def _per_call_us(fn: Callable[[], object], repeat: int) -> float:
+    began = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - began) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tools", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    tools = [_synthetic_tool(n) for n in range(args.tools - len(APP_TOOLS))] + APP_TOOLS
+    # The last tool is the worst case for a linear scan
+    target = tools[-1].name()
+
+    began = time.perf_counter()
+    registry = ToolRegistry()
+    for tool in tools:
+        registry.register(tool)
+    startup_ms = (time.perf_counter() - began) * 1000
+    assert registry.schemas() == [tool.to_openai_schema() for tool in tools]
+
+    rebuild_us = _per_call_us(lambda: [tool.to_openai_schema() for tool in tools], 200)
+    frozen_us = _per_call_us(registry.schemas, args.repeat)
+    scan_us = _per_call_us(
+        lambda: next(tool for tool in tools if tool.name() == target), args.repeat
+    )
+    lookup_us = _per_call_us(lambda: registry.get(target), args.repeat)
+
+    synthetic = tools[0].name()
+
+    async def dispatch() -> float:
+        await registry.execute(synthetic, ARGUMENTS)
+        began = time.perf_counter()
+        for _ in range(args.repeat):
+            await registry.execute(synthetic, ARGUMENTS)
+        return (time.perf_counter() - began) / args.repeat * 1e6
+
+    dispatch_us = asyncio.run(dispatch())
+
+    print(f"{len(registry)} tools registered in {startup_ms:.1f} ms")
+    print(
+        f"schemas per model round: {rebuild_us:.0f} us rebuilt -> {frozen_us:.2f} us frozen"
+    )
+    print(f"tool lookup by name: {scan_us:.1f} us scan -> {lookup_us:.2f} us dict")
+    print(f"full dispatch (validate, run on DB executor, JSON): {dispatch_us:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
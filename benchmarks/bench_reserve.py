@@ -0,0 +1,143 @@
+"""
+Concurrent reservation stress test: proves reserve() never oversells.
+
+Many threads race to reserve more units than exist, against one hot stock
+row and against a two-line (all-or-nothing) order. The run fails if more
+units are reserved than were in stock, if any quantity goes negative, or
+if an order is only partly applied.
+
+    uv run python -m benchmarks.bench_reserve [--threads 50] [--per-thread 40]
+
+Set STOCK_LEDGER=true to stress ledger mode instead of in-place updates.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from db.connection import get_writer_stats, query_all, query_one
+from db.repositories import reservations, stock
+from db.repositories.reservations import ReservationLine
+
+from .common import temp_database
+
+
+def _level(stock_id: int) -> int:
+    """Current stock level, including unfolded ledger movements."""
+    row = query_one("SELECT quantity FROM stock_levels WHERE id = ?", (stock_id,))
+    return row["quantity"]
+
+
+def _race(
+    lines: list[ReservationLine], threads: int, per_thread: int
+) -> tuple[int, int, float, list[float]]:
+    """Reserve `lines` from every thread; return successes, rejections, seconds, latencies."""
+    successes = rejections = 0
+    latencies: list[float] = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker() -> None:
+        nonlocal successes, rejections
+        start.wait()
+        for _ in range(per_thread):
+            began = time.perf_counter()
+            result = reservations.reserve(lines)
+            elapsed = time.perf_counter() - began
+            with lock:
+                latencies.append(elapsed)
+                if result.success:
+                    successes += 1
+                elif result.error:
+                    raise RuntimeError(result.error)
+                else:
+                    rejections += 1
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    began = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return successes, rejections, time.perf_counter() - began, latencies
+
+
+def _report(
+    name: str, successes: int, rejections: int, seconds: float, latencies: list[float]
+) -> None:
+    cuts = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name}: {successes} reserved, {rejections} rejected, "
+        f"{len(latencies) / seconds:.0f} attempts/s, "
+        f"p50 {cuts[49] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument(
+        "--per-thread", type=int, default=40, help="reservations per thread"
+    )
+    args = parser.parse_args()
+
+    attempts = args.threads * args.per_thread
+    # Half as many units as attempts, so most threads contend for the last ones
+    units = attempts // 2
+    failures: list[str] = []
+
+    with temp_database():
+        first, second = (row["id"] for row in query_all("SELECT id FROM stock LIMIT 2"))
+        print(
+            f"mode: {'ledger' if stock.LEDGER_MODE else 'in-place'}, {args.threads} threads, {attempts} attempts per scenario"
+        )
+
+        # One hot row, one unit per reservation
+        stock.update_quantity(first, units)
+        successes, rejections, seconds, latencies = _race(
+            [ReservationLine(first, 1)], args.threads, args.per_thread
+        )
+        _report("single line", successes, rejections, seconds, latencies)
+        if successes != units or _level(first) != 0:
+            failures.append(
+                f"single line: {successes} reserved of {units}, {_level(first)} left"
+            )
+
+        # Two lines; the second row runs out first and must block both
+        stock.update_quantity(first, units)
+        stock.update_quantity(second, units // 2)
+        successes, rejections, seconds, latencies = _race(
+            [ReservationLine(first, 1), ReservationLine(second, 1)],
+            args.threads,
+            args.per_thread,
+        )
+        _report("two lines", successes, rejections, seconds, latencies)
+        if (successes, _level(first), _level(second)) != (
+            units // 2,
+            units - units // 2,
+            0,
+        ):
+            failures.append(
+                f"two lines: {successes} reserved of {units // 2}, "
+                f"{_level(first)}/{_level(second)} left"
+            )
+
+        negative = query_one(
+            "SELECT COUNT(*) AS n FROM stock_levels WHERE quantity < 0"
+        )
+        if negative["n"]:
+            failures.append(f"{negative['n']} stock rows went negative")
+
+        writer = get_writer_stats()
+        print(
+            f"writer: p50 {writer.p50_ms:.1f} ms, p99 {writer.p99_ms:.1f} ms, avg batch {writer.avg_batch:.1f}"
+        )
+
+    if failures:
+        raise SystemExit("OVERSOLD: " + "; ".join(failures))
+    print("ok: no oversell")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Write latency under many concurrent sessions.
+
+Simulates `--sessions` chat sessions at once. Each one runs a mix of the
+app's writes (reservations, stock decrements and adjustments, prescription
+fulfilment, user creation) interleaved with catalog/stock reads and short
+pauses, the way tool calls arrive. Reports caller-side write and read
+latency plus the writer queue's own metrics.
+
+    uv run python -m benchmarks.bench_writes [--sessions 200] [--ops 25]
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from collections.abc import Callable
+
+from db.connection import get_writer_stats, query_all
+from db.repositories import medications, prescriptions, reservations, stock, users
+from db.repositories.reservations import ReservationLine
+
+from .common import temp_database
+
+QUANTITY = 1_000_000
+
+
+def _summary(latencies: list[float]) -> str:
+    cuts = statistics.quantiles(latencies, n=100)
+    return (
+        f"p50 {cuts[49] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms, "
+        f"max {max(latencies) * 1000:.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--ops", type=int, default=25, help="operations per session")
+    args = parser.parse_args()
+
+    with temp_database():
+        stock_ids = [row["id"] for row in query_all("SELECT id FROM stock")]
+        prescription_ids = [
+            row["id"] for row in query_all("SELECT id FROM prescriptions")
+        ]
+        names = [row["name_en"] for row in query_all("SELECT name_en FROM medications")]
+        for stock_id in stock_ids:
+            stock.update_quantity(stock_id, QUANTITY)
+        # One new user per session, on PINs the seed data doesn't use
+        taken = {row["pin"] for row in query_all("SELECT pin FROM users")}
+        pins = [pin for pin in (f"{n:04d}" for n in range(10_000)) if pin not in taken]
+
+        writes: list[float] = []
+        reads: list[float] = []
+        errors: list[BaseException] = []
+        lock = threading.Lock()
+        start = threading.Barrier(args.sessions)
+
+        def session(number: int) -> None:
+            rng = random.Random(number)
+            operations: list[tuple[list[float], Callable[[], object]]] = [
+                (
+                    writes,
+                    lambda: reservations.reserve(
+                        [ReservationLine(rng.choice(stock_ids), 1)]
+                    ),
+                ),
+                (writes, lambda: stock.decrement(rng.choice(stock_ids))),
+                (
+                    writes,
+                    lambda: stock.update_quantity(rng.choice(stock_ids), QUANTITY),
+                ),
+                (
+                    writes,
+                    lambda: prescriptions.fulfill(rng.choice(prescription_ids), 0),
+                ),
+                (reads, lambda: medications.get_by_name(rng.choice(names))),
+                (reads, lambda: stock.get_by_medication_name(rng.choice(names))),
+            ]
+            start.wait()
+            for op in range(args.ops):
+                bucket, run = operations[rng.randrange(len(operations))]
+                began = time.perf_counter()
+                try:
+                    if op == 0:
+                        bucket = writes
+                        users.create(pins[number], f"Load test user {number}")
+                    else:
+                        run()
+                except Exception as e:  # noqa: BLE001 - counted and reported below
+                    with lock:
+                        errors.append(e)
+                    continue
+                with lock:
+                    bucket.append(time.perf_counter() - began)
+                time.sleep(rng.uniform(0, 0.005))
+
+        threads = [
+            threading.Thread(target=session, args=(n,)) for n in range(args.sessions)
+        ]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        writer = get_writer_stats()
+
+    print(
+        f"{args.sessions} sessions, {len(writes) + len(reads)} operations in {elapsed:.1f}s, {len(errors)} errors"
+    )
+    print(f"writes ({len(writes)}, {len(writes) / elapsed:.0f}/s): {_summary(writes)}")
+    print(f"reads ({len(reads)}): {_summary(reads)}")
+    print(
+        f"writer: {writer.batches} batches, avg {writer.avg_batch:.1f} / max {writer.max_batch} jobs, "
+        f"p50 {writer.p50_ms:.1f} ms, p99 {writer.p99_ms:.1f} ms, {writer.failed} failed"
+    )
+    if errors:
+        raise SystemExit(f"first error: {errors[0]!r}")
+
+
+if __name__ == "__main__":
+    main()
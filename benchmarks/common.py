@@ -0,0 +1,29 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Benchmarks never touch data/pharmacy.db: each run gets a fresh seeded
+database in a temporary directory.
+"""
+
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from db import connection
+
+
+@contextmanager
+def temp_database(seed: bool = True) -> Iterator[Path]:
+    """Point the app at a new temporary database for the duration of the block."""
+    saved = connection.DATA_DIR, connection.DATABASE_PATH
+    with tempfile.TemporaryDirectory() as data_dir:
+        connection.DATA_DIR = Path(data_dir)
+        connection.DATABASE_PATH = connection.DATA_DIR / "pharmacy.db"
+        connection.init_db(seed=seed)
+        try:
+            yield connection.DATABASE_PATH
+        finally:
+            connection.close_pool()
+            connection.close_writer()
+            connection.DATA_DIR, connection.DATABASE_PATH = saved
@@ -1,31 +1,59 @@
 """Database module for the Pharmacist Assistant."""
 
-from db.connection import get_connection, get_db, init_db
+from db import equivalence, fuzzy, ledger
+from db.connection import (
+    get_connection,
+    get_db,
+    get_pool_stats,
+    get_writer_stats,
+    init_db,
+    write,
+)
 from db.models import (
     Ingredient,
     Medication,
     Prescription,
     Stock,
     StockAvailability,
+    StockMovement,
     User,
 )
-from db.repositories import medications, prescriptions, stock, users
+from db.repositories import (
+    cards,
+    medications,
+    prescriptions,
+    reservations,
+    stock,
+    users,
+)
 
 __all__ = [
     # Connection utilities
     "get_connection",
     "get_db",
+    "get_pool_stats",
+    "get_writer_stats",
     "init_db",
+    "write",
     # Models
     "Ingredient",
     "Medication",
     "Prescription",
     "Stock",
     "StockAvailability",
+    "StockMovement",
     "User",
+    # Fuzzy name resolution
+    "fuzzy",
+    # Ingredient-equivalence graph
+    "equivalence",
+    # Stock ledger compaction
+    "ledger",
     # Repositories
+    "cards",
     "medications",
     "prescriptions",
+    "reservations",
     "stock",
     "users",
 ]
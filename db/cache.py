@@ -0,0 +1,145 @@
+"""
+In-process read-through cache for catalog data.
+
+The catalog (medications, ingredients and dosage instructions) almost never
+changes, so lookups are served from a bounded LRU cache shared by all
+threads. Entries are invalidated together whenever the catalog version
+(bumped by triggers on every catalog change) moves on; the version is
+checked at most once per CATALOG_CACHE_CHECK_INTERVAL seconds.
+
+Only store immutable-in-practice values (rows, tuples of rows) and build
+fresh models from them, so callers can never mutate a shared entry.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from db.connection import query_one
+
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "4096"))
+CATALOG_CACHE_CHECK_INTERVAL = float(os.getenv("CATALOG_CACHE_CHECK_INTERVAL", "1"))
+
+# Returned by CatalogCache.get() for keys that are not cached
+MISSING: Any = object()
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Snapshot of catalog cache metrics."""
+
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class CatalogCache:
+    """Thread-safe LRU cache invalidated by the catalog version."""
+
+    def __init__(
+        self,
+        max_size: int = CATALOG_CACHE_SIZE,
+        check_interval: float = CATALOG_CACHE_CHECK_INTERVAL,
+    ):
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._version: int | None = None
+        self._checked_at = float("-inf")
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def version(self) -> int | None:
+        """
+        Return the catalog version entries are valid for, re-checking the
+        database if the last check is older than `check_interval`.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._version
+
+        row = query_one("SELECT version FROM catalog_version WHERE id = 1")
+        version = row["version"] if row else 0
+        with self._lock:
+            self._checked_at = now
+            # The version only grows; a slow thread that read an older one
+            # must not roll the cache back and revalidate stale entries
+            if self._version is None or version > self._version:
+                if self._entries:
+                    self._invalidations += 1
+                self._entries.clear()
+                self._version = version
+            return self._version
+
+    def get(self, key: Hashable) -> Any:
+        """Return a cached value, or MISSING (call version() first to revalidate)."""
+        with self._lock:
+            value = self._entries.get(key, MISSING)
+            if value is MISSING:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, version: int | None) -> None:
+        """
+        Store a value loaded while the catalog was at `version`.
+
+        Dropped if the catalog changed since, so a slow load can never
+        repopulate the cache with stale data.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return a cached value, loading and caching it on a miss."""
+        version = self.version()
+        value = self.get(key)
+        if value is MISSING:
+            value = loader()
+            self.put(key, value, version)
+        return value
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._checked_at = float("-inf")
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of cache metrics."""
+        with self._lock:
+            return CacheStats(
+                size=len(self._entries),
+                max_size=self.max_size,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                invalidations=self._invalidations,
+            )
@@ -1,9 +1,28 @@
 """Database connection utilities."""
 
+import asyncio
+import functools
+import os
+import queue
 import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Generator, Hashable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Generator
+from typing import Any
+
+from db.migrations import (
+    SCHEMA_VERSION,
+    fill_name_keys,
+    pending_migrations,
+    run_after_schema,
+    run_before_schema,
+    set_version,
+)
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 SQL_DIR = Path(__file__).parent / "sql"
@@ -12,27 +31,578 @@ DATABASE_PATH = DATA_DIR / "pharmacy.db"
 SCHEMA_PATH = SQL_DIR / "schema.sql"
 SEED_PATH = SQL_DIR / "seed.sql"
 
+# Connection pool sizing (override via environment)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Max queued writes group-committed in one transaction by the writer thread
+WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "64"))
+# Recent write latencies kept for percentile stats
+WRITE_LATENCY_SAMPLES = 10_000
+
+# Max values bound per IN (...) list (SQLITE_MAX_VARIABLE_NUMBER is 999 on old builds)
+MAX_IN_PARAMS = 500
+
+# Per-connection settings, applied once when a connection is created
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -16000",  # 16MB page cache
+    "PRAGMA mmap_size = 134217728",  # 128MB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+# SQLite VM steps between checks of whether a cancellable call was abandoned
+CANCEL_CHECK_STEPS = 100
+
+
+class _Call:
+    """A database call on the DB executor that its caller may abandon."""
+
+    def __init__(self) -> None:
+        self.cancelled = False
+
+    def is_cancelled(self) -> bool:
+        """SQLite progress handler: a true result aborts the running statement."""
+        return self.cancelled
+
+
+# The cancellable call running on the current thread, if any
+_calls = threading.local()
+
+
+def _current_call() -> _Call | None:
+    """The cancellable call running on the current thread, if any."""
+    return getattr(_calls, "call", None)
+
 
-def get_connection() -> sqlite3.Connection:
-    """Create a new database connection with foreign keys enabled."""
-    conn = sqlite3.connect(DATABASE_PATH)
+def get_connection(read_only: bool = False) -> sqlite3.Connection:
+    """
+    Create a new, fully configured database connection.
+
+    Read-only connections (used by the pool) reject any mutation, so every
+    write has to go through the single writer.
+    """
+    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
     return conn
 
 
+@dataclass(frozen=True)
+class PoolStats:
+    """Snapshot of connection pool metrics."""
+
+    max_size: int
+    size: int
+    idle: int
+    in_use: int
+    created: int
+    discarded: int
+    checkouts: int
+    waits: int
+    timeouts: int
+    total_wait_ms: float
+    max_wait_ms: float
+    avg_checkout_ms: float
+    max_checkout_ms: float
+
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived, read-only SQLite connections.
+
+    Connections are created lazily up to `max_size` and handed out one per
+    thread. A thread that already holds a connection gets the same one back
+    on nested checkouts, so helpers called inside a `get_db()` block share
+    its transaction instead of deadlocking on the pool.
+    """
+
+    def __init__(self, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: deque[sqlite3.Connection] = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+        self._created = 0
+        self._discarded = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_checkout = 0.0
+        self._max_checkout = 0.0
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Check that a pooled connection is still usable."""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """Close a connection and release its slot. Caller holds the lock."""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._size -= 1
+        self._discarded += 1
+        self._cond.notify()
+
+    def _checkout(self) -> sqlite3.Connection:
+        """Take a healthy connection from the pool, creating one if allowed."""
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        waited = False
+        call = _current_call()
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                if call is not None and call.cancelled:
+                    raise sqlite3.OperationalError("interrupted")
+
+                if self._idle:
+                    conn = self._idle.pop()
+                    if self._is_healthy(conn):
+                        break
+                    self._discard(conn)
+                    continue
+
+                if self._size < self.max_size:
+                    # Reserve the slot, then connect outside the lock
+                    self._size += 1
+                    self._cond.release()
+                    try:
+                        conn = get_connection(read_only=True)
+                    except BaseException:
+                        self._cond.acquire()
+                        self._size -= 1
+                        self._cond.notify()
+                        raise
+                    self._cond.acquire()
+                    self._created += 1
+                    break
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.timeout}s "
+                        f"(pool size {self.max_size})"
+                    )
+                if not waited:
+                    waited = True
+                    self._waits += 1
+                self._cond.wait(remaining)
+
+            elapsed = time.perf_counter() - started
+            self._checkouts += 1
+            self._total_checkout += elapsed
+            self._max_checkout = max(self._max_checkout, elapsed)
+            if waited:
+                self._total_wait += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+        if call is not None:
+            # Abort the call's statements as soon as it is abandoned
+            conn.set_progress_handler(call.is_cancelled, CANCEL_CHECK_STEPS)
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool, discarding it if unusable."""
+        try:
+            conn.set_progress_handler(None, 0)
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            with self._cond:
+                self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._discard(conn)
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Generator[sqlite3.Connection]:
+        """Check out a connection for the current thread."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._checkin(conn)
+
+    @contextmanager
+    def detached(self) -> Generator[sqlite3.Connection]:
+        """
+        Check out a connection that is not bound to the current thread.
+
+        For long-lived readers such as streaming generators, so that other
+        get_db() blocks on the same thread keep their own transactions.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def holds_connection(self) -> bool:
+        """Whether the current thread has a connection checked out."""
+        return self.held_connection() is not None
+
+    def held_connection(self) -> sqlite3.Connection | None:
+        """The connection the current thread has checked out, if any."""
+        return getattr(self._local, "conn", None)
+
+    def stats(self) -> PoolStats:
+        """Return a snapshot of pool metrics."""
+        with self._cond:
+            return PoolStats(
+                max_size=self.max_size,
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                created=self._created,
+                discarded=self._discarded,
+                checkouts=self._checkouts,
+                waits=self._waits,
+                timeouts=self._timeouts,
+                total_wait_ms=self._total_wait * 1000,
+                max_wait_ms=self._max_wait * 1000,
+                avg_checkout_ms=(
+                    self._total_checkout / self._checkouts * 1000
+                    if self._checkouts
+                    else 0.0
+                ),
+                max_checkout_ms=self._max_checkout * 1000,
+            )
+
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop())
+            self._cond.notify_all()
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Get the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool() -> None:
+    """Close the process-wide pool (a new one is created on next use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool_stats() -> PoolStats:
+    """Return metrics for the process-wide connection pool."""
+    return get_pool().stats()
+
+
 @contextmanager
-def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """Context manager for database connections."""
-    conn = get_connection()
-    try:
-        yield conn
-        conn.commit()
-    except sqlite3.Error:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+def get_db() -> Generator[sqlite3.Connection]:
+    """
+    Context manager for pooled database connections.
+
+    The outermost block commits on success and rolls back on error; nested
+    blocks on the same thread share the outer connection and transaction.
+    Pooled connections are read-only (PRAGMA query_only); mutations go
+    through write().
+    """
+    pool = get_pool()
+    outermost = not pool.holds_connection()
+    with pool.connection() as conn:
+        if not outermost:
+            yield conn
+            return
+        try:
+            yield conn
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+
+type WriteJob[R] = Callable[[sqlite3.Connection], R]
+
+
+@dataclass(frozen=True)
+class WriterStats:
+    """Snapshot of single-writer queue metrics."""
+
+    queued: int
+    submitted: int
+    completed: int
+    failed: int
+    batches: int
+    max_batch: int
+    avg_batch: float
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class WriteQueue:
+    """
+    Single writer thread that applies every database mutation.
+
+    SQLite allows one writer at a time, so rather than having request
+    threads contend for the write lock, jobs are queued to one thread with
+    its own connection. Whatever has queued up while a transaction was
+    running is group-committed in the next one: each job runs in its own
+    savepoint, so a failing job is rolled back alone and the rest commit.
+    Futures resolve only after the commit.
+
+    Jobs receive the writer's connection and should read through it (pooled
+    reads do not see the job's uncommitted changes).
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue: queue.SimpleQueue[
+            tuple[WriteJob[Any], Future[Any], float] | None
+        ] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn: sqlite3.Connection | None = None
+
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._batches = 0
+        self._batched_jobs = 0
+        self._max_batch = 0
+        self._latencies: deque[float] = deque(maxlen=WRITE_LATENCY_SAMPLES)
+
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit[R](self, job: WriteJob[R]) -> Future[R]:
+        """Queue a write job and return a future for its result."""
+        future: Future[R] = Future()
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Database writer is closed")
+            self._submitted += 1
+        self._queue.put((job, future, time.perf_counter()))
+        return future
+
+    def on_writer_thread(self) -> bool:
+        """Whether the caller is running inside a write job."""
+        return threading.current_thread() is self._thread
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The writer's connection (only valid on the writer thread)."""
+        assert self._conn is not None and self.on_writer_thread()
+        return self._conn
+
+    def _run(self) -> None:
+        self._conn = get_connection()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                stop = False
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._commit_batch(batch)
+                if stop:
+                    return
+        finally:
+            self._conn.close()
+
+    def _commit_batch(
+        self, batch: list[tuple[WriteJob[Any], Future[Any], float]]
+    ) -> None:
+        """Run a batch of jobs in one transaction, then resolve their futures."""
+        conn = self._conn
+        assert conn is not None
+        outcomes: list[tuple[bool, Any]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, _, _ in batch:
+                conn.execute("SAVEPOINT write_job")
+                try:
+                    outcomes.append((True, job(conn)))
+                except Exception as e:  # noqa: BLE001 - handed to the job's future
+                    conn.execute("ROLLBACK TO write_job")
+                    outcomes.append((False, e))
+                finally:
+                    conn.execute("RELEASE write_job")
+            conn.commit()
+        except Exception as e:  # noqa: BLE001 - handed to every future in the batch
+            # The transaction itself failed; nothing in the batch was applied
+            if conn.in_transaction:
+                conn.rollback()
+            outcomes = [(False, e)] * len(batch)
+
+        finished = time.perf_counter()
+        with self._lock:
+            self._batches += 1
+            self._batched_jobs += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            for (_, _, queued_at), (ok, _) in zip(batch, outcomes):
+                self._latencies.append(finished - queued_at)
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+        for (_, future, _), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self) -> WriterStats:
+        """Return a snapshot of writer metrics."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return WriterStats(
+                queued=self._submitted - self._completed - self._failed,
+                submitted=self._submitted,
+                completed=self._completed,
+                failed=self._failed,
+                batches=self._batches,
+                max_batch=self._max_batch,
+                avg_batch=(
+                    self._batched_jobs / self._batches if self._batches else 0.0
+                ),
+                p50_ms=_percentile(latencies, 0.5) * 1000,
+                p99_ms=_percentile(latencies, 0.99) * 1000,
+                max_ms=(latencies[-1] * 1000 if latencies else 0.0),
+            )
+
+    def close(self) -> None:
+        """Finish queued writes, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        if not self.on_writer_thread():
+            self._thread.join()
+
+
+_writer: WriteQueue | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> WriteQueue:
+    """Get the process-wide writer, starting it on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = WriteQueue()
+    return _writer
+
+
+def close_writer() -> None:
+    """Drain and stop the process-wide writer (a new one starts on next use)."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+def get_writer_stats() -> WriterStats:
+    """Return metrics for the process-wide writer."""
+    return get_writer().stats()
+
+
+def write[R](job: WriteJob[R]) -> R:
+    """
+    Run a mutation on the single writer and wait until it is committed.
+
+    Inside another write job it runs directly on the writer's connection.
+    It must not be called while the caller's pooled connection has an open
+    transaction: that snapshot would not see the write, and upgrading it
+    to a writer could fail with SQLITE_BUSY_SNAPSHOT.
+    """
+    writer = get_writer()
+    if writer.on_writer_thread():
+        return job(writer.connection)
+    held = get_pool().held_connection()
+    if held is not None and held.in_transaction:
+        raise sqlite3.ProgrammingError(
+            "write() called inside an open read transaction; "
+            "finish the get_db() block first"
+        )
+    return writer.submit(job).result()
+
+
+def is_lock_error(error: BaseException) -> bool:
+    """Check whether an error is SQLite lock contention (safe to retry)."""
+    if isinstance(error, PoolTimeoutError) or not isinstance(
+        error, sqlite3.OperationalError
+    ):
+        return False
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
 
 
 def query_one(sql: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
@@ -51,26 +621,155 @@ def query_all(sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
 
 
 def execute(sql: str, params: tuple[Any, ...] = ()) -> int:
-    """Execute a statement and return the lastrowid."""
-    with get_db() as conn:
-        cursor = conn.execute(sql, params)
-        return cursor.lastrowid or 0
+    """Execute a statement on the writer and return the lastrowid."""
+    return write(lambda conn: conn.execute(sql, params).lastrowid or 0)
 
 
 def execute_many(sql: str, params_list: list[tuple[Any, ...]]) -> None:
-    """Execute a statement with multiple parameter sets."""
-    with get_db() as conn:
+    """Execute a statement with multiple parameter sets on the writer."""
+
+    def job(conn: sqlite3.Connection) -> None:
         conn.executemany(sql, params_list)
 
+    write(job)
+
+
+def query_in(
+    sql: str,
+    values: Iterable[Any],
+    params: tuple[Any, ...] = (),
+) -> list[dict[str, Any]]:
+    """
+    Execute a query for a batch of values and return all rows.
+
+    `{placeholders}` in the SQL is expanded to one `?` per value, bound
+    after `params`. Values are de-duplicated and sent in chunks of
+    MAX_IN_PARAMS, all on one connection.
+    """
+    unique = list(dict.fromkeys(values))
+    rows: list[dict[str, Any]] = []
+    if not unique:
+        return rows
+    with get_db() as conn:
+        for start in range(0, len(unique), MAX_IN_PARAMS):
+            chunk = unique[start : start + MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = conn.execute(
+                sql.format(placeholders=placeholders), (*params, *chunk)
+            )
+            rows.extend(dict(row) for row in cursor.fetchall())
+    return rows
+
+
+def group_rows(
+    rows: Iterable[dict[str, Any]], key: str
+) -> dict[Hashable, list[dict[str, Any]]]:
+    """Group rows by the value of a column, preserving row order."""
+    grouped: dict[Hashable, list[dict[str, Any]]] = {}
+    for row in rows:
+        grouped.setdefault(row[key], []).append(row)
+    return grouped
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the dedicated executor that runs blocking database work."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=POOL_SIZE, thread_name_prefix="db"
+                )
+    return _executor
+
+
+async def run_in_db[**P, R](fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+    """Run a blocking database call on the DB executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def run_in_db_with_timeout[**P, R](
+    timeout: float | None, fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs
+) -> R:
+    """
+    Like run_in_db, but give up after `timeout` seconds (None: no limit).
+
+    A call that has not started yet is dropped from the executor queue. One
+    that is running has its current and later pooled-connection queries
+    aborted with "interrupted", so its executor thread and connection are
+    freed promptly instead of being held until it would have finished.
+    Python work between queries can't be interrupted and runs to the next
+    query. Raises TimeoutError. Only for reads: writes submitted to the
+    writer before the timeout still commit.
+    """
+    call = _Call()
+
+    def target() -> R:
+        _calls.call = call
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _calls.call = None
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(get_executor(), target), timeout
+        )
+    except TimeoutError:
+        call.cancelled = True
+        raise
+
+
+def to_async[**P, R](fn: Callable[P, R]) -> Callable[P, Awaitable[R]]:
+    """Wrap a blocking database function as a coroutine run on the DB executor."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        return await run_in_db(fn, *args, **kwargs)
+
+    return wrapper
+
 
 def init_db(seed: bool = False) -> None:
-    """Initialize the database with the schema and optionally seed data."""
+    """
+    Initialize the database with the schema and optionally seed data.
+
+    Safe to re-run on an existing database: pending migrations are applied
+    first, then the schema creates any missing tables, indexes and triggers.
+    Catalog rows missing their lookup keys get them filled in.
+    """
     DATA_DIR.mkdir(exist_ok=True)
 
-    with get_db() as conn:
+    # A dedicated writable connection: pooled ones are read-only
+    conn = get_connection()
+    try:
+        existing = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'medications'"
+        ).fetchone()
+        pending = [] if existing is None else pending_migrations(conn)
+        run_before_schema(conn, pending)
+
         with open(SCHEMA_PATH) as f:
             conn.executescript(f.read())
 
+        if existing is None:
+            set_version(conn, SCHEMA_VERSION)
+        else:
+            run_after_schema(conn, pending)
+
         if seed and SEED_PATH.exists():
             with open(SEED_PATH) as f:
                 conn.executescript(f.read())
+        # Lookup keys are computed in Python, not by triggers (see schema.sql)
+        fill_name_keys(conn)
+        conn.commit()
+    finally:
+        conn.close()
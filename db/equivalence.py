@@ -0,0 +1,141 @@
+"""
+Ingredient-equivalence graph over the medication catalog.
+
+Maps each medication to the others whose active-ingredient set is the
+same, a proper subset or a proper superset of its own, so substitutes can
+be suggested without ingredient searches. The graph is built in memory
+from medication_ingredients on first use and rebuilt whenever the catalog
+version (bumped by triggers on every junction-table change) moves on.
+"""
+
+import threading
+from collections.abc import Collection
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from db.connection import query_all, query_one, to_async
+from db.repositories import cards
+
+# How an alternative's ingredients relate to the medication's:
+# same set, only some of them (subset) or all of them plus others (superset)
+type Relation = Literal["same", "subset", "superset"]
+
+# Closest substitutes first
+_RELATION_ORDER: dict[Relation, int] = {"same": 0, "superset": 1, "subset": 2}
+
+
+@dataclass(frozen=True)
+class Equivalent:
+    """A medication related to another by its ingredient set."""
+
+    medication_id: int
+    relation: Relation
+
+
+class EquivalenceIndex:
+    """Precomputed same/subset/superset relations between medications."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        # Medication -> related medications, closest first
+        self._related: dict[int, tuple[Equivalent, ...]] = {}
+
+    def refresh(self) -> None:
+        """Rebuild the graph from the catalog, if it changed."""
+        row = query_one("SELECT version FROM catalog_version WHERE id = 1")
+        version = row["version"] if row else 0
+
+        with self._lock:
+            if version == self._version:
+                return
+
+            members: dict[int, set[int]] = {}
+            for row in query_all(
+                "SELECT medication_id, ingredient_id FROM medication_ingredients"
+            ):
+                members.setdefault(row["medication_id"], set()).add(
+                    row["ingredient_id"]
+                )
+            ingredients = {med: frozenset(ids) for med, ids in members.items()}
+
+            # Ingredient -> medications containing it; only medications
+            # sharing an ingredient can be related
+            postings: dict[int, set[int]] = {}
+            for med, ids in ingredients.items():
+                for ingredient_id in ids:
+                    postings.setdefault(ingredient_id, set()).add(med)
+
+            related: dict[int, tuple[Equivalent, ...]] = {}
+            for med, ids in ingredients.items():
+                candidates = set().union(*(postings[i] for i in ids)) - {med}
+                edges: list[Equivalent] = []
+                for other in candidates:
+                    other_ids = ingredients[other]
+                    if other_ids == ids:
+                        edges.append(Equivalent(other, "same"))
+                    elif other_ids < ids:
+                        edges.append(Equivalent(other, "subset"))
+                    elif other_ids > ids:
+                        edges.append(Equivalent(other, "superset"))
+                edges.sort(key=lambda e: (_RELATION_ORDER[e.relation], e.medication_id))
+                related[med] = tuple(edges)
+
+            self._related = related
+            self._version = version
+
+    def related(self, medication_id: int) -> tuple[Equivalent, ...]:
+        """Medications whose ingredients are the same, a subset or a superset."""
+        self.refresh()
+        with self._lock:
+            return self._related.get(medication_id, ())
+
+
+# Process-wide index shared by all sessions
+index = EquivalenceIndex()
+
+
+def get_in_stock_alternatives(
+    medication_id: int, relations: Collection[Relation] | None = None
+) -> list[dict[str, Any]]:
+    """
+    In-stock substitutes for a medication, closest relation first.
+
+    Each entry is the alternative's medication card (see cards) with only
+    its in-stock dosages, plus its `relation` and the ingredients it is
+    `missing` or has `extra` compared to the medication. Fetched with a
+    single card lookup for all related medications, optionally limited
+    to the given relations.
+    """
+    related = [
+        e
+        for e in index.related(medication_id)
+        if relations is None or e.relation in relations
+    ]
+    if not related:
+        return []
+
+    cards_by_id = cards.get_by_ids([medication_id, *(e.medication_id for e in related)])
+    medication = cards_by_id.get(medication_id)
+    if medication is None:
+        return []
+    names = {ing["id"]: ing["name_en"] for ing in medication["ingredients"]}
+
+    alternatives: list[dict[str, Any]] = []
+    for equivalent in related:
+        card = cards_by_id.get(equivalent.medication_id)
+        if card is None:
+            continue
+        card["stock"] = [s for s in card["stock"] if s["quantity"] > 0]
+        if not card["stock"]:
+            continue
+        own = {ing["id"]: ing["name_en"] for ing in card["ingredients"]}
+        card["relation"] = equivalent.relation
+        card["missing"] = [name for i, name in names.items() if i not in own]
+        card["extra"] = [name for i, name in own.items() if i not in names]
+        alternatives.append(card)
+    return alternatives
+
+
+# Async variant, run on the dedicated DB executor
+arefresh = to_async(index.refresh)
@@ -0,0 +1,147 @@
+"""
+Typo-tolerant name resolution over the medication/ingredient catalog.
+
+An in-memory trigram index over normalized EN/HE names. It is built on
+first use and kept current by comparing the catalog version (bumped by
+triggers on every catalog change) and re-indexing only the rows whose
+names changed.
+"""
+
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Literal
+
+from db.connection import query_all, query_one, to_async
+from db.models import normalize_name
+
+type EntryKind = Literal["medication", "ingredient"]
+type EntryKey = tuple[EntryKind, int]
+
+# Candidates scoring below this (Dice coefficient on trigrams) are ignored
+MIN_SCORE = 0.3
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    """A ranked fuzzy-match candidate."""
+
+    kind: EntryKind
+    id: int
+    name_en: str
+    name_he: str | None
+    score: float
+
+
+def _trigrams(key: str) -> set[str]:
+    """Character trigrams of a normalized name, padded to weight word edges."""
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Trigram index mapping misspelled names to catalog entries."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        # Entry -> (name_en, name_he) as last indexed
+        self._names: dict[EntryKey, tuple[str, str | None]] = {}
+        # Entry -> trigram sets of each of its normalized names
+        self._grams: dict[EntryKey, list[set[str]]] = {}
+        # Trigram -> entries containing it
+        self._postings: dict[str, set[EntryKey]] = {}
+
+    def _add(self, key: EntryKey, name_en: str, name_he: str | None) -> None:
+        grams = [
+            _trigrams(normalized)
+            for normalized in (normalize_name(name_en), normalize_name(name_he))
+            if normalized
+        ]
+        self._names[key] = (name_en, name_he)
+        self._grams[key] = grams
+        for gram in set().union(*grams):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def _remove(self, key: EntryKey) -> None:
+        for gram in set().union(*self._grams.pop(key, [])):
+            entries = self._postings.get(gram)
+            if entries is not None:
+                entries.discard(key)
+                if not entries:
+                    del self._postings[gram]
+        self._names.pop(key, None)
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the catalog, if it changed."""
+        row = query_one("SELECT version FROM catalog_version WHERE id = 1")
+        version = row["version"] if row else 0
+
+        with self._lock:
+            if version == self._version:
+                return
+
+            current: dict[EntryKey, tuple[str, str | None]] = {}
+            for row in query_all("SELECT id, name_en, name_he FROM medications"):
+                current[("medication", row["id"])] = (row["name_en"], row["name_he"])
+            for row in query_all("SELECT id, name_en, name_he FROM ingredients"):
+                current[("ingredient", row["id"])] = (row["name_en"], row["name_he"])
+
+            for key in self._names.keys() - current.keys():
+                self._remove(key)
+            for key, names in current.items():
+                if self._names.get(key) != names:
+                    self._remove(key)
+                    self._add(key, *names)
+            self._version = version
+
+    def suggest(
+        self,
+        name: str,
+        kind: EntryKind | None = None,
+        limit: int = 3,
+    ) -> list[Suggestion]:
+        """Return the closest catalog entries to a (possibly misspelled) name."""
+        normalized = normalize_name(name)
+        if not normalized:
+            return []
+        self.refresh()
+
+        query = _trigrams(normalized)
+        with self._lock:
+            shared: Counter[EntryKey] = Counter()
+            for gram in query:
+                for key in self._postings.get(gram, ()):
+                    if kind is None or key[0] == kind:
+                        shared[key] += 1
+
+            scored: list[Suggestion] = []
+            for key in shared:
+                score = max(
+                    2 * len(query & grams) / (len(query) + len(grams))
+                    for grams in self._grams[key]
+                )
+                if score >= MIN_SCORE:
+                    name_en, name_he = self._names[key]
+                    scored.append(Suggestion(key[0], key[1], name_en, name_he, score))
+
+        scored.sort(key=lambda s: (-s.score, s.name_en))
+        return scored[:limit]
+
+
+# Process-wide index shared by all sessions
+index = FuzzyIndex()
+
+
+def suggest_medications(name: str, limit: int = 3) -> list[str]:
+    """English names of the medications closest to a misspelled name."""
+    return [s.name_en for s in index.suggest(name, kind="medication", limit=limit)]
+
+
+def suggest_ingredients(name: str, limit: int = 3) -> list[str]:
+    """English names of the ingredients closest to a misspelled name."""
+    return [s.name_en for s in index.suggest(name, kind="ingredient", limit=limit)]
+
+
+# Async variant, run on the dedicated DB executor
+arefresh = to_async(index.refresh)
@@ -0,0 +1,109 @@
+"""
+Background compaction for the append-only stock ledger.
+
+In ledger mode (STOCK_LEDGER=true) reservations append rows to
+stock_movements instead of updating the stock row, and current levels are
+read from the stock_levels view (snapshot plus unapplied movements). The
+compactor periodically folds those movements into the snapshot so the
+per-read delta stays small.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from db.repositories import stock
+
+logger = logging.getLogger(__name__)
+
+# Seconds between compaction passes
+COMPACT_INTERVAL = float(os.getenv("STOCK_COMPACT_INTERVAL", "1"))
+
+
+@dataclass(frozen=True)
+class CompactorStats:
+    """Snapshot of ledger compaction metrics."""
+
+    runs: int
+    folded: int
+    errors: int
+    last_ms: float
+
+
+class Compactor:
+    """Daemon thread that folds stock movements into the snapshot."""
+
+    def __init__(self, interval: float = COMPACT_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._runs = 0
+        self._folded = 0
+        self._errors = 0
+        self._last = 0.0
+
+    def run_once(self) -> int:
+        """Run one compaction pass and return the number of movements folded."""
+        started = time.perf_counter()
+        try:
+            folded = stock.compact_movements()
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        with self._lock:
+            self._runs += 1
+            self._folded += folded
+            self._last = time.perf_counter() - started
+        return folded
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Stock ledger compaction failed")
+
+    def start(self) -> None:
+        """Start the background thread (no-op if already running)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._loop, name="stock-compactor", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread after a final pass."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        self.run_once()
+
+    def stats(self) -> CompactorStats:
+        """Return a snapshot of compaction metrics."""
+        with self._lock:
+            return CompactorStats(
+                runs=self._runs,
+                folded=self._folded,
+                errors=self._errors,
+                last_ms=self._last * 1000,
+            )
+
+
+# Process-wide compactor
+compactor = Compactor()
+
+
+def start() -> None:
+    """Start background compaction when ledger mode is enabled."""
+    if stock.LEDGER_MODE:
+        compactor.start()
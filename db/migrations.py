@@ -0,0 +1,163 @@
+"""
+Schema migrations for databases created by older versions of schema.sql.
+
+`schema.sql` always describes the latest schema and is applied with
+`IF NOT EXISTS`, which creates new tables, indexes and triggers but cannot
+add columns to existing tables. Each migration below brings an existing
+database up to date; the applied version is tracked in `PRAGMA user_version`.
+"""
+
+import sqlite3
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from db.models.dosage import parse_mg, parse_unit_family
+from db.models.normalize import normalize_name
+
+type MigrationStep = Callable[[sqlite3.Connection], None]
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    A schema upgrade.
+
+    `before_schema` runs before schema.sql is applied (e.g. adding columns
+    that new indexes refer to); `after_schema` runs once the new tables and
+    triggers exist (e.g. populating them from existing rows).
+    """
+
+    before_schema: MigrationStep | None = None
+    after_schema: MigrationStep | None = None
+
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    """Check whether a table has a column."""
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return any(row["name"] == column for row in rows)
+
+
+def _add_column(conn: sqlite3.Connection, table: str, definition: str) -> None:
+    """Add a column unless it already exists."""
+    column = definition.split()[0]
+    if not _column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+
+def fill_name_keys(conn: sqlite3.Connection) -> int:
+    """
+    Compute the normalized lookup keys that are missing.
+
+    Keys need Python's Unicode normalization (see normalize_name), so
+    triggers only clear them when a name or dosage changes; this fills in
+    every cleared or never-set key. Returns the number of rows updated.
+    """
+    updated = 0
+    for table in ("medications", "ingredients"):
+        rows = conn.execute(
+            f"SELECT id, name_en, name_he FROM {table} "
+            "WHERE name_en_key IS NULL OR (name_he_key IS NULL AND name_he IS NOT NULL)"
+        ).fetchall()
+        conn.executemany(
+            f"UPDATE {table} SET name_en_key = ?, name_he_key = ? WHERE id = ?",
+            [
+                (
+                    normalize_name(row["name_en"]),
+                    normalize_name(row["name_he"]),
+                    row["id"],
+                )
+                for row in rows
+            ],
+        )
+        updated += len(rows)
+
+    rows = conn.execute(
+        "SELECT id, dosage FROM dosage_instructions "
+        "WHERE dosage_key IS NULL AND dosage IS NOT NULL"
+    ).fetchall()
+    conn.executemany(
+        "UPDATE dosage_instructions SET dosage_key = ? WHERE id = ?",
+        [(normalize_name(row["dosage"]), row["id"]) for row in rows],
+    )
+    return updated + len(rows)
+
+
+def _add_name_keys(conn: sqlite3.Connection) -> None:
+    """Add normalized lookup keys for names and dosages."""
+    _add_column(conn, "medications", "name_en_key TEXT")
+    _add_column(conn, "medications", "name_he_key TEXT")
+    _add_column(conn, "ingredients", "name_en_key TEXT")
+    _add_column(conn, "ingredients", "name_he_key TEXT")
+    _add_column(conn, "dosage_instructions", "dosage_key TEXT")
+    fill_name_keys(conn)
+
+
+def _build_search_index(conn: sqlite3.Connection) -> None:
+    """Populate the FTS5 search tables from existing catalog rows."""
+    conn.execute("INSERT INTO medications_fts(medications_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO ingredients_fts(ingredients_fts) VALUES ('rebuild')")
+
+
+def _add_strength_columns(conn: sqlite3.Connection) -> None:
+    """Add parsed dosage strength columns and recreate views that expose them."""
+    for table in ("stock", "prescriptions", "dosage_instructions"):
+        _add_column(conn, table, "strength_mg REAL")
+        _add_column(conn, table, "unit_family TEXT")
+        rows = conn.execute(f"SELECT id, dosage FROM {table}").fetchall()
+        conn.executemany(
+            f"UPDATE {table} SET strength_mg = ?, unit_family = ? WHERE id = ?",
+            [
+                (parse_mg(row["dosage"]), parse_unit_family(row["dosage"]), row["id"])
+                for row in rows
+            ],
+        )
+    # Recreated by schema.sql with the new columns
+    conn.execute("DROP VIEW IF EXISTS stock_levels")
+
+
+def _build_medication_cards(conn: sqlite3.Connection) -> None:
+    """Populate the medication cards read model from existing rows."""
+    conn.execute(
+        "INSERT OR REPLACE INTO medication_cards SELECT * FROM medication_card_source"
+    )
+
+
+# Append new migrations at the end; never reorder or remove entries
+MIGRATIONS: list[Migration] = [
+    Migration(before_schema=_add_name_keys),
+    Migration(after_schema=_build_search_index),
+    Migration(before_schema=_add_strength_columns),
+    Migration(after_schema=_build_medication_cards),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """Get the schema version recorded in the database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_version(conn: sqlite3.Connection, version: int) -> None:
+    """Record the schema version in the database."""
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def pending_migrations(conn: sqlite3.Connection) -> list[Migration]:
+    """Get the migrations not yet applied to the database."""
+    return MIGRATIONS[get_version(conn) :]
+
+
+def run_before_schema(conn: sqlite3.Connection, pending: list[Migration]) -> None:
+    """Run the pre-schema steps of pending migrations."""
+    for migration in pending:
+        if migration.before_schema:
+            migration.before_schema(conn)
+
+
+def run_after_schema(conn: sqlite3.Connection, pending: list[Migration]) -> None:
+    """Run the post-schema steps of pending migrations and record the version."""
+    for migration in pending:
+        if migration.after_schema:
+            migration.after_schema(conn)
+    set_version(conn, SCHEMA_VERSION)
@@ -2,9 +2,12 @@
 
 from db.models.dosage import (
     calculate_equivalent_months,
+    calculate_equivalent_months_batch,
     calculate_equivalent_quantity,
     is_dosage_equivalent,
+    is_dosage_equivalent_batch,
     parse_mg,
+    parse_unit_family,
 )
 from db.models.entities import (
     Ingredient,
@@ -12,8 +15,11 @@ from db.models.entities import (
     Prescription,
     Stock,
     StockAvailability,
+    StockMovement,
     User,
 )
+from db.models.normalize import normalize_name
+from db.models.packs import PackLine, PackPlan, solve_pack_combination
 
 __all__ = [
     # Entities
@@ -22,10 +28,20 @@ __all__ = [
     "Prescription",
     "Stock",
     "StockAvailability",
+    "StockMovement",
     "User",
     # Dosage utilities
     "calculate_equivalent_months",
+    "calculate_equivalent_months_batch",
     "calculate_equivalent_quantity",
     "is_dosage_equivalent",
+    "is_dosage_equivalent_batch",
     "parse_mg",
+    "parse_unit_family",
+    # Name normalization
+    "normalize_name",
+    # Pack combinations
+    "PackLine",
+    "PackPlan",
+    "solve_pack_combination",
 ]
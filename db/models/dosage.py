@@ -1,8 +1,21 @@
 """Dosage parsing and equivalence utilities."""
 
+import math
 import re
+from collections.abc import Sequence
+from functools import lru_cache
 
+# Leading amount and unit; mcg/ug are tried before the bare "g" prefix
+_DOSAGE_PATTERN = re.compile(r"([\d.]+)\s*(mg|mcg|ug|g)")
+_MG_PER_UNIT = {"mg": 1.0, "g": 1000.0, "mcg": 0.001, "ug": 0.001}
+# Per-volume part of a concentration, e.g. "/5ml" in "25mg/5ml"
+_PER_UNIT_PATTERN = re.compile(r"\s*/\s*[\d.]*\s*([a-z]+)")
 
+# Distinct dosage strings remembered by parse_mg (the catalog has few)
+PARSE_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse_mg(dosage: str) -> float | None:
     """
     Parse a dosage string and extract the milligram value.
@@ -12,29 +25,37 @@ def parse_mg(dosage: str) -> float | None:
     - "0.5g", "0.5 g" (converts to mg)
     - "25mg/5ml" (extracts the mg portion)
 
-    Returns None if parsing fails.
+    Returns None if parsing fails. Results are memoized.
     """
     if not dosage:
         return None
 
-    dosage = dosage.lower().strip()
+    match = _DOSAGE_PATTERN.match(dosage.lower().strip())
+    if not match:
+        return None
+    return float(match.group(1)) * _MG_PER_UNIT[match.group(2)]
 
-    # Try mg pattern first (most common)
-    mg_match = re.match(r"^([\d.]+)\s*mg", dosage)
-    if mg_match:
-        return float(mg_match.group(1))
 
-    # Try g pattern (convert to mg)
-    g_match = re.match(r"^([\d.]+)\s*g(?:ram)?", dosage)
-    if g_match:
-        return float(g_match.group(1)) * 1000
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_unit_family(dosage: str) -> str | None:
+    """
+    Classify what a dosage string's strength measures.
 
-    # Try mcg/ug pattern (convert to mg)
-    mcg_match = re.match(r"^([\d.]+)\s*(?:mcg|ug)", dosage)
-    if mcg_match:
-        return float(mcg_match.group(1)) / 1000
+    - "mg" for an amount per unit: "500mg", "0.5g", "100mcg"
+    - "mg/<unit>" for a concentration: "25mg/5ml" -> "mg/ml"
 
-    return None
+    Strengths (parse_mg) are only comparable within one family.
+    Returns None if parsing fails.
+    """
+    if not dosage:
+        return None
+
+    text = dosage.lower().strip()
+    match = _DOSAGE_PATTERN.match(text)
+    if not match:
+        return None
+    per_unit = _PER_UNIT_PATTERN.match(text, match.end())
+    return f"mg/{per_unit.group(1)}" if per_unit else "mg"
 
 
 def is_dosage_equivalent(
@@ -85,8 +106,6 @@ def calculate_equivalent_quantity(
     Returns None if dosages cannot be parsed.
     Returns the ceiling (rounded up) quantity needed.
     """
-    import math
-
     prescribed_mg = parse_mg(prescribed_dosage)
     stock_mg = parse_mg(stock_dosage)
 
@@ -122,8 +141,6 @@ def calculate_equivalent_months(
     - Dosages cannot be parsed
     - Rounding up would exceed the tolerance threshold
     """
-    import math
-
     requested_mg = parse_mg(requested_dosage)
     prescribed_mg = parse_mg(prescribed_dosage)
 
@@ -140,3 +157,66 @@ def calculate_equivalent_months(
         return None
 
     return rounded_months
+
+
+def calculate_equivalent_months_batch(
+    requested_dosages: Sequence[str],
+    requested_quantities: Sequence[int],
+    prescribed_dosage: str,
+    tolerance: float = 0.25,
+) -> list[int | None]:
+    """
+    calculate_equivalent_months for many (dosage, quantity) candidates at once.
+
+    The prescribed dosage is parsed once and candidate dosages go through
+    the parse cache, so evaluating every stock row of a medication costs
+    one pass. Returns one result per candidate, in order.
+    """
+    if len(requested_dosages) != len(requested_quantities):
+        raise ValueError("requested_dosages and requested_quantities differ in length")
+
+    prescribed_mg = parse_mg(prescribed_dosage)
+    if prescribed_mg is None:
+        return [None] * len(requested_dosages)
+
+    max_ratio = 1 + tolerance
+    results: list[int | None] = []
+    for dosage, quantity in zip(requested_dosages, requested_quantities):
+        requested_mg = parse_mg(dosage)
+        if requested_mg is None:
+            results.append(None)
+            continue
+        exact_months = requested_mg * quantity / prescribed_mg
+        rounded_months = math.ceil(exact_months)
+        if exact_months > 0 and rounded_months / exact_months > max_ratio:
+            results.append(None)
+        else:
+            results.append(rounded_months)
+    return results
+
+
+def is_dosage_equivalent_batch(
+    prescribed_dosage: str,
+    prescribed_quantity: int,
+    requested_dosages: Sequence[str],
+    requested_quantities: Sequence[int],
+    tolerance: float = 0.25,
+) -> list[bool]:
+    """is_dosage_equivalent for many (dosage, quantity) candidates at once."""
+    if len(requested_dosages) != len(requested_quantities):
+        raise ValueError("requested_dosages and requested_quantities differ in length")
+
+    prescribed_mg = parse_mg(prescribed_dosage)
+    if prescribed_mg is None:
+        return [False] * len(requested_dosages)
+
+    total_prescribed = prescribed_mg * prescribed_quantity
+    max_allowed = total_prescribed * (1 + tolerance)
+    results: list[bool] = []
+    for dosage, quantity in zip(requested_dosages, requested_quantities):
+        requested_mg = parse_mg(dosage)
+        results.append(
+            requested_mg is not None
+            and total_prescribed <= requested_mg * quantity <= max_allowed
+        )
+    return results
@@ -37,11 +37,24 @@ class Stock(BaseModel):
     dosage: str | None = None
     quantity: int = 0
     updated_at: datetime
+    # Parsed from dosage: milligrams and unit family ("mg", "mg/ml", ...)
+    strength_mg: float | None = None
+    unit_family: str | None = None
 
     # Optional: populated when joining with medications
     medication: Medication | None = None
 
 
+class StockMovement(BaseModel):
+    """Ledger entry recording a change to a stock entry's quantity."""
+
+    id: int
+    stock_id: int
+    delta: int
+    reason: str
+    created_at: datetime
+
+
 class StockAvailability(BaseModel):
     """Result of checking stock availability."""
 
@@ -82,6 +95,9 @@ class Prescription(BaseModel):
     months_fulfilled: int = 0
     created_at: datetime
     expires_at: datetime | None = None
+    # Parsed from dosage: milligrams and unit family ("mg", "mg/ml", ...)
+    strength_mg: float | None = None
+    unit_family: str | None = None
 
     # Optional: populated when joining
     user: User | None = None
@@ -0,0 +1,39 @@
+"""Name normalization for case- and diacritic-insensitive lookups."""
+
+import re
+import unicodedata
+
+# Hebrew geresh/gershayim and the ASCII/typographic quotes used in their place
+_QUOTE_CHARS = str.maketrans(
+    {
+        "׳": "'",  # ׳ HEBREW PUNCTUATION GERESH
+        "’": "'",  # ’ RIGHT SINGLE QUOTATION MARK
+        "`": "'",
+        "״": '"',  # ״ HEBREW PUNCTUATION GERSHAYIM
+        "”": '"',  # ” RIGHT DOUBLE QUOTATION MARK
+        "־": "-",  # ־ HEBREW PUNCTUATION MAQAF
+    }
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_name(text: str | None) -> str | None:
+    """
+    Normalize a name into a lookup key.
+
+    - Case-folds (English and other cased scripts)
+    - Strips combining marks: Latin accents and Hebrew niqqud/cantillation
+    - Unifies geresh/gershayim/maqaf with their ASCII equivalents
+    - Collapses whitespace
+
+    Returns None for None so it can be used directly on nullable columns.
+    """
+    if text is None:
+        return None
+
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(
+        char for char in decomposed if unicodedata.category(char) != "Mn"
+    )
+    folded = stripped.translate(_QUOTE_CHARS).casefold()
+    return _WHITESPACE.sub(" ", folded).strip()
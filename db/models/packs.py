@@ -0,0 +1,110 @@
+"""Pack-combination solver for filling a prescription from mixed dosages."""
+
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from db.models.dosage import calculate_equivalent_months_batch, parse_mg
+
+
+@dataclass(frozen=True)
+class PackLine:
+    """Packs of one dosage in a plan, and the prescription months they fill."""
+
+    dosage: str
+    quantity: int
+    months: int
+
+
+@dataclass(frozen=True)
+class PackPlan:
+    """A combination of packs that fills a number of prescription months."""
+
+    lines: tuple[PackLine, ...]
+    months: int
+    total_packs: int
+    total_mg: float
+
+
+# DP state: (packs, mg, lines used, lines); tuples compare in objective order
+type _State = tuple[int, float, int, tuple[PackLine, ...]]
+
+
+def solve_pack_combination(
+    prescribed_dosage: str,
+    months: int,
+    available: Sequence[tuple[str, int]],
+    tolerance: float = 0.25,
+) -> PackPlan | None:
+    """
+    Find the pack combination that fills exactly `months` of a prescription.
+
+    `available` lists (dosage, packs in stock) for the medication. Each
+    dosage becomes one reservation line whose months are counted as
+    calculate_equivalent_months does (rounded up, within `tolerance`), and
+    the line months must add up to `months`.
+
+    Minimizes the number of packs, then the total milligrams dispensed,
+    then the number of distinct dosages. Since price is per pack of a
+    medication, the fewest packs is also the cheapest. Solved as a bounded
+    knapsack over months: for each dosage only the smallest pack count
+    reaching each month total is kept. Returns None if no combination fits.
+    """
+    prescribed_mg = parse_mg(prescribed_dosage)
+    if prescribed_mg is None or months <= 0:
+        return None
+
+    stock: dict[str, int] = {}
+    for dosage, quantity in available:
+        if quantity > 0:
+            stock[dosage] = stock.get(dosage, 0) + quantity
+
+    best: list[_State | None] = [None] * (months + 1)
+    best[0] = (0, 0.0, 0, ())
+
+    for dosage, quantity in stock.items():
+        strength = parse_mg(dosage)
+        if not strength:
+            continue
+
+        # More packs than this would exceed `months` even after tolerance
+        max_packs = min(
+            quantity,
+            math.floor(months * prescribed_mg * (1 + tolerance) / strength) + 1,
+        )
+        counts = range(1, max_packs + 1)
+        line_months = calculate_equivalent_months_batch(
+            [dosage] * len(counts), counts, prescribed_dosage, tolerance
+        )
+
+        # Fewest packs of this dosage that fill each month count
+        options: dict[int, int] = {}
+        for count, filled in zip(counts, line_months):
+            if filled and filled <= months and filled not in options:
+                options[filled] = count
+
+        updated = best.copy()
+        for filled, state in enumerate(best):
+            if state is None:
+                continue
+            packs, mg, used, lines = state
+            for line_months_filled, count in options.items():
+                total = filled + line_months_filled
+                if total > months:
+                    continue
+                candidate: _State = (
+                    packs + count,
+                    mg + count * strength,
+                    used + 1,
+                    (*lines, PackLine(dosage, count, line_months_filled)),
+                )
+                current = updated[total]
+                if current is None or candidate[:3] < current[:3]:
+                    updated[total] = candidate
+        best = updated
+
+    solution = best[months]
+    if solution is None:
+        return None
+    packs, mg, _, lines = solution
+    return PackPlan(lines=lines, months=months, total_packs=packs, total_mg=mg)
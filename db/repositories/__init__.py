@@ -7,10 +7,14 @@ from db.repositories import medications as medications
 from db.repositories import users as users
 from db.repositories import prescriptions as prescriptions
 from db.repositories import stock as stock
+from db.repositories import reservations as reservations
+from db.repositories import cards as cards
 
 __all__ = [
+    "cards",
     "medications",
     "prescriptions",
+    "reservations",
     "stock",
     "users",
 ]
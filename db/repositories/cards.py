@@ -0,0 +1,83 @@
+"""
+Medication cards repository: a denormalized read model.
+
+Each card is one JSON document per medication holding its catalog fields
+and ingredients, kept current by SQL triggers on the catalog tables (see
+schema.sql). Stock levels change far more often than the catalog, so they
+are not stored in the card; reads merge the live per-dosage levels from
+stock_levels into it, in the same indexed lookup.
+"""
+
+import json
+import sqlite3
+from collections.abc import Iterable
+from typing import Any
+
+from db.connection import query_in, query_one, write
+from db.models import normalize_name
+from db.repositories import medications
+
+# Card plus its live stock levels (strength order), for one medication_cards row
+_SELECT_CARD = """
+    SELECT c.medication_id, c.card, (
+        SELECT json_group_array(json_object(
+            'stock_id', id, 'dosage', dosage, 'quantity', quantity,
+            'strength_mg', strength_mg, 'unit_family', unit_family
+        ))
+        FROM (
+            SELECT * FROM stock_levels l
+            WHERE l.medication_id = c.medication_id
+            ORDER BY l.strength_mg IS NULL, l.strength_mg, l.dosage
+        )
+    ) AS stock
+    FROM medication_cards c
+"""
+
+
+def _from_row(row: dict[str, Any]) -> dict[str, Any]:
+    """Build a card dict from a row selected with _SELECT_CARD."""
+    card = json.loads(row["card"])
+    card["stock"] = json.loads(row["stock"])
+    return card
+
+
+def get_by_id(medication_id: int) -> dict[str, Any] | None:
+    """Get the card for a medication by ID."""
+    row = query_one(_SELECT_CARD + "WHERE c.medication_id = ?", (medication_id,))
+    return _from_row(row) if row else None
+
+
+def get_by_ids(medication_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+    """Get the cards for several medications in one query, keyed by ID."""
+    rows = query_in(
+        _SELECT_CARD + "WHERE c.medication_id IN ({placeholders})", medication_ids
+    )
+    return {row["medication_id"]: _from_row(row) for row in rows}
+
+
+def get_by_name(name: str) -> dict[str, Any] | None:
+    """
+    Get the card for a medication by name (EN or HE).
+
+    Matches like medications.get_by_name: case-insensitive and ignoring
+    diacritics/niqqud, filling in missing lookup keys on a miss.
+    """
+    key = normalize_name(name)
+    sql = _SELECT_CARD + "WHERE c.name_en_key = ? OR c.name_he_key = ?"
+    row = query_one(sql, (key, key))
+    if not row and medications.sync_name_keys():
+        # Added or renamed by another client since the last sync
+        row = query_one(sql, (key, key))
+    return _from_row(row) if row else None
+
+
+def rebuild() -> None:
+    """Rebuild every card from the source tables."""
+
+    def job(conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM medication_cards")
+        conn.execute(
+            "INSERT INTO medication_cards SELECT * FROM medication_card_source"
+        )
+
+    write(job)
@@ -1,7 +1,17 @@
 """Medications repository."""
 
-from db.connection import query_all, query_one
-from db.models import Ingredient, Medication
+import sqlite3
+
+from db.cache import MISSING, CacheStats, CatalogCache
+from db.connection import (
+    group_rows,
+    query_all,
+    query_in,
+    query_one,
+    write,
+)
+from db.migrations import fill_name_keys
+from db.models import Ingredient, Medication, normalize_name
 
 
 def _row_to_medication(row: dict) -> Medication:
@@ -18,25 +28,80 @@ def _row_to_medication(row: dict) -> Medication:
     )
 
 
+# Read-through cache for point lookups; stock and prescriptions are never cached
+_cache = CatalogCache()
+
+
+# The trigram tokenizer can only use the index for terms of 3+ characters
+_FTS_MIN_TERM_LENGTH = 3
+
+
+def _fts_phrase(term: str, columns: str | None = None) -> str:
+    """Build an FTS5 MATCH expression for a literal substring."""
+    phrase = '"' + term.replace('"', '""') + '"'
+    return f"{{{columns}}} : {phrase}" if columns else phrase
+
+
+def _get_ingredients_for_medications(
+    medication_ids: list[int],
+) -> dict[int, list[Ingredient]]:
+    """Get ingredients for many medications, querying only uncached ones in one batch."""
+    version = _cache.version()
+    rows_by_medication: dict[int, tuple[dict, ...]] = {}
+    missing: list[int] = []
+    for medication_id in medication_ids:
+        cached = _cache.get(("ingredients", medication_id))
+        if cached is MISSING:
+            missing.append(medication_id)
+        else:
+            rows_by_medication[medication_id] = cached
+
+    if missing:
+        rows = query_in(
+            """
+            SELECT mi.medication_id, i.id, i.name_en, i.name_he
+            FROM medication_ingredients mi
+            JOIN ingredients i ON i.id = mi.ingredient_id
+            WHERE mi.medication_id IN ({placeholders})
+            """,
+            missing,
+        )
+        grouped = group_rows(rows, "medication_id")
+        for medication_id in missing:
+            group = tuple(grouped.get(medication_id, ()))
+            rows_by_medication[medication_id] = group
+            _cache.put(("ingredients", medication_id), group, version)
+
+    return {
+        medication_id: [
+            Ingredient(id=row["id"], name_en=row["name_en"], name_he=row["name_he"])
+            for row in group
+        ]
+        for medication_id, group in rows_by_medication.items()
+        if group
+    }
+
+
 def _get_ingredients_for_medication(medication_id: int) -> list[Ingredient]:
     """Get all ingredients for a medication."""
-    rows = query_all(
-        """
-        SELECT i.id, i.name_en, i.name_he
-        FROM ingredients i
-        JOIN medication_ingredients mi ON i.id = mi.ingredient_id
-        WHERE mi.medication_id = ?
-        """,
-        (medication_id,),
-    )
-    return [Ingredient(**row) for row in rows]
+    return _get_ingredients_for_medications([medication_id]).get(medication_id, [])
+
+
+def _attach_ingredients(medications: list[Medication]) -> None:
+    """Populate ingredients on a list of medications with a single query."""
+    by_medication = _get_ingredients_for_medications([med.id for med in medications])
+    for med in medications:
+        med.ingredients = by_medication.get(med.id, [])
 
 
 def get_by_id(
     medication_id: int, include_ingredients: bool = False
 ) -> Medication | None:
     """Get a medication by ID."""
-    row = query_one("SELECT * FROM medications WHERE id = ?", (medication_id,))
+    row = _cache.get_or_load(
+        ("medication", medication_id),
+        lambda: query_one("SELECT * FROM medications WHERE id = ?", (medication_id,)),
+    )
     if not row:
         return None
 
@@ -51,14 +116,27 @@ def get_by_name(
     include_ingredients: bool = False,
     language: str = "en",
 ) -> Medication | None:
-    """Get a medication by name (searches both EN and HE names)."""
-    row = query_one(
-        """
-        SELECT * FROM medications
-        WHERE LOWER(name_en) = LOWER(?) OR LOWER(name_he) = LOWER(?)
-        """,
-        (name, name),
-    )
+    """
+    Get a medication by name (searches both EN and HE names).
+
+    Matching is case-insensitive and ignores diacritics/niqqud (see
+    normalize_name), using the indexed normalized key columns.
+    """
+    key = normalize_name(name)
+
+    def load() -> dict | None:
+        return query_one(
+            """
+            SELECT * FROM medications
+            WHERE name_en_key = ? OR name_he_key = ?
+            """,
+            (key, key),
+        )
+
+    row = _cache.get_or_load(("medication_name", key), load)
+    if not row and sync_name_keys():
+        # Added or renamed by another client since the last sync
+        row = load()
     if not row:
         return None
 
@@ -73,42 +151,90 @@ def search(
     include_ingredients: bool = False,
 ) -> list[Medication]:
     """Search medications by name (partial match)."""
-    rows = query_all(
-        """
-        SELECT * FROM medications
-        WHERE LOWER(name_en) LIKE LOWER(?) OR LOWER(name_he) LIKE LOWER(?)
-        ORDER BY name_en
-        """,
-        (f"%{query}%", f"%{query}%"),
-    )
+    if len(query.strip()) >= _FTS_MIN_TERM_LENGTH:
+        rows = query_all(
+            """
+            SELECT * FROM medications
+            WHERE id IN (
+                SELECT rowid FROM medications_fts WHERE medications_fts MATCH ?
+            )
+            ORDER BY name_en
+            """,
+            (_fts_phrase(query, "name_en name_he"),),
+        )
+    else:
+        rows = query_all(
+            """
+            SELECT * FROM medications
+            WHERE LOWER(name_en) LIKE LOWER(?) OR LOWER(name_he) LIKE LOWER(?)
+            ORDER BY name_en
+            """,
+            (f"%{query}%", f"%{query}%"),
+        )
 
     medications = [_row_to_medication(row) for row in rows]
     if include_ingredients:
-        for med in medications:
-            med.ingredients = _get_ingredients_for_medication(med.id)
+        _attach_ingredients(medications)
     return medications
 
 
+def search_ranked(query: str, limit: int = 20) -> list[Medication]:
+    """
+    Full-text search over names and descriptions, best matches first.
+
+    Name prefix matches rank first, then by BM25 relevance with names
+    weighted above descriptions.
+    """
+    if len(query.strip()) < _FTS_MIN_TERM_LENGTH:
+        return search(query)[:limit]
+
+    prefix = f"{normalize_name(query)}%"
+    rows = query_all(
+        """
+        SELECT m.* FROM medications_fts f
+        JOIN medications m ON m.id = f.rowid
+        WHERE medications_fts MATCH ?
+        ORDER BY (m.name_en_key LIKE ? OR m.name_he_key LIKE ?) DESC,
+                 bm25(medications_fts, 10.0, 10.0, 1.0, 1.0)
+        LIMIT ?
+        """,
+        (_fts_phrase(query), prefix, prefix, limit),
+    )
+    return [_row_to_medication(row) for row in rows]
+
+
 def get_by_ingredient(
     ingredient_name: str,
     include_ingredients: bool = False,
 ) -> list[Medication]:
     """Get all medications containing a specific ingredient."""
-    rows = query_all(
-        """
-        SELECT m.* FROM medications m
-        JOIN medication_ingredients mi ON m.id = mi.medication_id
-        JOIN ingredients i ON i.id = mi.ingredient_id
-        WHERE LOWER(i.name_en) LIKE LOWER(?) OR LOWER(i.name_he) LIKE LOWER(?)
-        ORDER BY m.name_en
-        """,
-        (f"%{ingredient_name}%", f"%{ingredient_name}%"),
-    )
+    if len(ingredient_name.strip()) >= _FTS_MIN_TERM_LENGTH:
+        rows = query_all(
+            """
+            SELECT m.* FROM medications m
+            JOIN medication_ingredients mi ON m.id = mi.medication_id
+            WHERE mi.ingredient_id IN (
+                SELECT rowid FROM ingredients_fts WHERE ingredients_fts MATCH ?
+            )
+            ORDER BY m.name_en
+            """,
+            (_fts_phrase(ingredient_name),),
+        )
+    else:
+        rows = query_all(
+            """
+            SELECT m.* FROM medications m
+            JOIN medication_ingredients mi ON m.id = mi.medication_id
+            JOIN ingredients i ON i.id = mi.ingredient_id
+            WHERE LOWER(i.name_en) LIKE LOWER(?) OR LOWER(i.name_he) LIKE LOWER(?)
+            ORDER BY m.name_en
+            """,
+            (f"%{ingredient_name}%", f"%{ingredient_name}%"),
+        )
 
     medications = [_row_to_medication(row) for row in rows]
     if include_ingredients:
-        for med in medications:
-            med.ingredients = _get_ingredients_for_medication(med.id)
+        _attach_ingredients(medications)
     return medications
 
 
@@ -118,8 +244,7 @@ def get_all(include_ingredients: bool = False) -> list[Medication]:
 
     medications = [_row_to_medication(row) for row in rows]
     if include_ingredients:
-        for med in medications:
-            med.ingredients = _get_ingredients_for_medication(med.id)
+        _attach_ingredients(medications)
     return medications
 
 
@@ -133,25 +258,88 @@ def get_dosage_instructions(
     If dosage is provided, returns instructions for that specific dosage.
     Otherwise, returns instructions for all available dosages.
     """
-    if dosage:
-        rows = query_all(
-            """
-            SELECT dosage, adult_dose, child_dose, frequency, max_daily,
-                   instructions, warnings
-            FROM dosage_instructions
-            WHERE medication_id = ? AND LOWER(dosage) = LOWER(?)
-            """,
-            (medication_id, dosage),
-        )
-    else:
-        rows = query_all(
-            """
-            SELECT dosage, adult_dose, child_dose, frequency, max_daily,
-                   instructions, warnings
-            FROM dosage_instructions
-            WHERE medication_id = ?
-            ORDER BY dosage
-            """,
-            (medication_id,),
-        )
+    dosage_key = normalize_name(dosage) if dosage else None
+
+    def load() -> tuple[dict, ...]:
+        if dosage_key:
+            rows = query_all(
+                """
+                SELECT dosage, adult_dose, child_dose, frequency, max_daily,
+                       instructions, warnings
+                FROM dosage_instructions
+                WHERE medication_id = ? AND dosage_key = ?
+                """,
+                (medication_id, dosage_key),
+            )
+        else:
+            rows = query_all(
+                """
+                SELECT dosage, adult_dose, child_dose, frequency, max_daily,
+                       instructions, warnings
+                FROM dosage_instructions
+                WHERE medication_id = ?
+                ORDER BY dosage
+                """,
+                (medication_id,),
+            )
+        return tuple(rows)
+
+    rows = _cache.get_or_load(("dosage_instructions", medication_id, dosage_key), load)
+    if not rows and dosage_key and sync_name_keys():
+        rows = load()
+    # Copies, so callers cannot modify the cached rows
     return [dict(row) for row in rows]
+
+
+def rebuild_search_index() -> None:
+    """Rebuild the full-text search tables from the catalog."""
+
+    def job(conn: sqlite3.Connection) -> None:
+        conn.execute("INSERT INTO medications_fts(medications_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO ingredients_fts(ingredients_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO medications_fts(medications_fts) VALUES ('optimize')")
+        conn.execute("INSERT INTO ingredients_fts(ingredients_fts) VALUES ('optimize')")
+
+    write(job)
+
+
+# Catalog version the lookup keys were last filled in at
+_keys_version: int | None = None
+
+
+def sync_name_keys() -> int:
+    """
+    Fill in lookup keys for catalog rows added or renamed since the last sync.
+
+    Keys are computed in Python, so rows written by other SQLite clients
+    have none (see schema.sql) and don't match exact lookups until this
+    runs; lookups that miss call it before giving up. Skipped while the
+    catalog version is unchanged. Returns the number of rows updated.
+    """
+    global _keys_version
+    row = query_one("SELECT version FROM catalog_version WHERE id = 1")
+    if row and row["version"] == _keys_version:
+        return 0
+
+    def job(conn: sqlite3.Connection) -> tuple[int, int]:
+        updated = fill_name_keys(conn)
+        row = conn.execute(
+            "SELECT version FROM catalog_version WHERE id = 1"
+        ).fetchone()
+        return updated, row["version"]
+
+    updated, _keys_version = write(job)
+    if updated:
+        # Cached misses for the new keys are stale
+        _cache.clear()
+    return updated
+
+
+def cache_stats() -> CacheStats:
+    """Return metrics for the catalog lookup cache."""
+    return _cache.stats()
+
+
+def clear_cache() -> None:
+    """Drop all cached catalog lookups (e.g. after bulk catalog edits)."""
+    _cache.clear()
@@ -1,8 +1,33 @@
 """Prescriptions repository."""
 
-from db.connection import execute, query_all, query_one
-from db.models import Prescription
-from db.repositories import medications, users
+from collections.abc import Iterator
+
+from db.connection import get_pool, query_all, query_one, write
+from db.models import Medication, Prescription, User
+
+# Prescriptions joined with their user and medication, so a single query
+# hydrates everything. Joined columns are prefixed to avoid name clashes.
+_JOINED_SELECT = """
+    SELECT p.*,
+           u.pin AS user_pin,
+           u.name AS user_name,
+           u.created_at AS user_created_at,
+           m.name_en AS medication_name_en,
+           m.name_he AS medication_name_he,
+           m.description_en AS medication_description_en,
+           m.description_he AS medication_description_he,
+           m.price AS medication_price,
+           m.requires_prescription AS medication_requires_prescription,
+           m.created_at AS medication_created_at
+    FROM prescriptions p
+    JOIN users u ON u.id = p.user_id
+    JOIN medications m ON m.id = p.medication_id
+"""
+
+_ACTIVE_FILTER = """
+    p.months_fulfilled < p.months_supply
+    AND (p.expires_at IS NULL OR p.expires_at > datetime('now'))
+"""
 
 
 def _row_to_prescription(
@@ -10,7 +35,7 @@ def _row_to_prescription(
     include_user: bool = False,
     include_medication: bool = False,
 ) -> Prescription:
-    """Convert a database row to a Prescription model."""
+    """Convert a joined database row to a Prescription model."""
     prescription = Prescription(
         id=row["id"],
         user_id=row["user_id"],
@@ -20,11 +45,27 @@ def _row_to_prescription(
         months_fulfilled=row["months_fulfilled"],
         created_at=row["created_at"],
         expires_at=row["expires_at"],
+        strength_mg=row["strength_mg"],
+        unit_family=row["unit_family"],
     )
     if include_user:
-        prescription.user = users.get_by_id(row["user_id"])
+        prescription.user = User(
+            id=row["user_id"],
+            pin=row["user_pin"],
+            name=row["user_name"],
+            created_at=row["user_created_at"],
+        )
     if include_medication:
-        prescription.medication = medications.get_by_id(row["medication_id"])
+        prescription.medication = Medication(
+            id=row["medication_id"],
+            name_en=row["medication_name_en"],
+            name_he=row["medication_name_he"],
+            description_en=row["medication_description_en"],
+            description_he=row["medication_description_he"],
+            price=row["medication_price"],
+            requires_prescription=bool(row["medication_requires_prescription"]),
+            created_at=row["medication_created_at"],
+        )
     return prescription
 
 
@@ -34,7 +75,7 @@ def get_by_id(
     include_medication: bool = False,
 ) -> Prescription | None:
     """Get a prescription by ID."""
-    row = query_one("SELECT * FROM prescriptions WHERE id = ?", (prescription_id,))
+    row = query_one(f"{_JOINED_SELECT} WHERE p.id = ?", (prescription_id,))
     if not row:
         return None
     return _row_to_prescription(row, include_user, include_medication)
@@ -44,27 +85,19 @@ def get_by_user_id(
     user_id: int,
     active_only: bool = True,
     include_medication: bool = False,
+    include_user: bool = False,
 ) -> list[Prescription]:
     """Get all prescriptions for a user."""
+    where = "p.user_id = ?"
     if active_only:
-        rows = query_all(
-            """
-            SELECT * FROM prescriptions
-            WHERE user_id = ?
-            AND months_fulfilled < months_supply
-            AND (expires_at IS NULL OR expires_at > datetime('now'))
-            ORDER BY created_at DESC
-            """,
-            (user_id,),
-        )
-    else:
-        rows = query_all(
-            "SELECT * FROM prescriptions WHERE user_id = ? ORDER BY created_at DESC",
-            (user_id,),
-        )
+        where += f" AND {_ACTIVE_FILTER}"
+    rows = query_all(
+        f"{_JOINED_SELECT} WHERE {where} ORDER BY p.created_at DESC",
+        (user_id,),
+    )
     return [
         _row_to_prescription(
-            row, include_user=False, include_medication=include_medication
+            row, include_user=include_user, include_medication=include_medication
         )
         for row in rows
     ]
@@ -75,11 +108,25 @@ def get_by_user_pin(
     active_only: bool = True,
     include_medication: bool = False,
 ) -> list[Prescription]:
-    """Get all prescriptions for a user by their PIN."""
-    user = users.get_by_pin(pin)
-    if not user:
-        return []
-    return get_by_user_id(user.id, active_only, include_medication)
+    """
+    Get all prescriptions for a user by their PIN.
+
+    Loads prescriptions, the user and (optionally) medications in a single
+    joined query; the user is always populated since it comes for free.
+    """
+    where = "u.pin = ?"
+    if active_only:
+        where += f" AND {_ACTIVE_FILTER}"
+    rows = query_all(
+        f"{_JOINED_SELECT} WHERE {where} ORDER BY p.created_at DESC",
+        (pin,),
+    )
+    return [
+        _row_to_prescription(
+            row, include_user=True, include_medication=include_medication
+        )
+        for row in rows
+    ]
 
 
 def fulfill(prescription_id: int, months: int = 1) -> bool:
@@ -87,18 +134,17 @@ def fulfill(prescription_id: int, months: int = 1) -> bool:
     Fulfill a prescription for the specified number of months.
     Returns False if prescription not found or already fully fulfilled.
     """
-    prescription = get_by_id(prescription_id)
-    if not prescription:
-        return False
-
-    if prescription.months_fulfilled + months > prescription.months_supply:
-        return False
-
-    execute(
-        "UPDATE prescriptions SET months_fulfilled = months_fulfilled + ? WHERE id = ?",
-        (months, prescription_id),
+    # Checked and applied in one statement so concurrent callers cannot overfill
+    updated = write(
+        lambda conn: (
+            conn.execute(
+                "UPDATE prescriptions SET months_fulfilled = months_fulfilled + ? "
+                "WHERE id = ? AND months_fulfilled + ? <= months_supply",
+                (months, prescription_id, months),
+            ).rowcount
+        )
     )
-    return True
+    return updated > 0
 
 
 def is_valid(prescription_id: int) -> bool:
@@ -115,21 +161,31 @@ def is_valid(prescription_id: int) -> bool:
     return row is not None
 
 
+def iter_all(
+    active_only: bool = True,
+    include_user: bool = False,
+    include_medication: bool = False,
+    batch_size: int = 500,
+) -> Iterator[Prescription]:
+    """
+    Stream all prescriptions, hydrated from a single joined query.
+
+    Rows are fetched in batches of `batch_size`, so memory stays flat for
+    large back-office listings. A dedicated pooled connection is held until
+    the iterator is exhausted or closed.
+    """
+    where = f"WHERE {_ACTIVE_FILTER}" if active_only else ""
+    with get_pool().detached() as conn:
+        cursor = conn.execute(f"{_JOINED_SELECT} {where} ORDER BY p.created_at DESC")
+        while rows := cursor.fetchmany(batch_size):
+            for row in rows:
+                yield _row_to_prescription(dict(row), include_user, include_medication)
+
+
 def get_all(
     active_only: bool = True,
     include_user: bool = False,
     include_medication: bool = False,
 ) -> list[Prescription]:
     """Get all prescriptions."""
-    if active_only:
-        rows = query_all(
-            """
-            SELECT * FROM prescriptions
-            WHERE months_fulfilled < months_supply
-            AND (expires_at IS NULL OR expires_at > datetime('now'))
-            ORDER BY created_at DESC
-            """
-        )
-    else:
-        rows = query_all("SELECT * FROM prescriptions ORDER BY created_at DESC")
-    return [_row_to_prescription(row, include_user, include_medication) for row in rows]
+    return list(iter_all(active_only, include_user, include_medication))
@@ -0,0 +1,140 @@
+"""Reservations repository: atomic stock/prescription updates."""
+
+import random
+import sqlite3
+import time
+from dataclasses import dataclass, field
+
+from db.connection import is_lock_error, write
+from db.repositories import stock
+
+# Retry policy for lock contention (exponential backoff with jitter)
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.01
+MAX_DELAY = 0.5
+
+
+@dataclass(frozen=True)
+class ReservationLine:
+    """One item to reserve: packs from a stock entry, optionally against a prescription."""
+
+    stock_id: int
+    quantity: int
+    prescription_id: int | None = None
+    # Prescription months consumed by this item (required with prescription_id)
+    months: int = 0
+
+
+@dataclass
+class LineResult:
+    """Outcome for a single reservation line."""
+
+    stock_id: int
+    quantity: int
+    reserved: bool = False
+    # Current stock quantity, reported when there was not enough
+    available: int | None = None
+    # Remaining prescription months, reported when there were not enough
+    months_remaining: int | None = None
+    error: str | None = None
+
+
+@dataclass
+class ReservationResult:
+    """Outcome of an all-or-nothing reservation."""
+
+    success: bool
+    lines: list[LineResult] = field(default_factory=list)
+    attempts: int = 0
+    error: str | None = None
+
+
+class _Rejected(Exception):
+    """Raised inside the transaction to roll back a partially applied reservation."""
+
+    def __init__(self, results: list[LineResult]):
+        self.results = results
+
+
+def _apply(conn: sqlite3.Connection, lines: list[ReservationLine]) -> list[LineResult]:
+    """
+    Apply every line with conditional updates inside the open transaction.
+
+    Each decrement only succeeds if enough stock (and prescription months)
+    remain at that moment, so concurrent reservers can never oversell.
+    """
+    results: list[LineResult] = []
+    for line in lines:
+        result = LineResult(stock_id=line.stock_id, quantity=line.quantity)
+        results.append(result)
+
+        if not stock.remove_quantity(conn, line.stock_id, line.quantity):
+            row = conn.execute(
+                "SELECT quantity FROM stock_levels WHERE id = ?", (line.stock_id,)
+            ).fetchone()
+            result.available = row["quantity"] if row else 0
+            result.error = "not in stock" if row is None else "insufficient stock"
+            continue
+
+        if line.prescription_id is not None:
+            cursor = conn.execute(
+                "UPDATE prescriptions SET months_fulfilled = months_fulfilled + ? "
+                "WHERE id = ? AND months_fulfilled + ? <= months_supply",
+                (line.months, line.prescription_id, line.months),
+            )
+            if cursor.rowcount == 0:
+                row = conn.execute(
+                    "SELECT months_supply - months_fulfilled AS remaining "
+                    "FROM prescriptions WHERE id = ?",
+                    (line.prescription_id,),
+                ).fetchone()
+                result.months_remaining = row["remaining"] if row else 0
+                result.error = "insufficient prescription months"
+                continue
+
+        result.reserved = True
+    return results
+
+
+def reserve(
+    lines: list[ReservationLine],
+    max_attempts: int = MAX_ATTEMPTS,
+) -> ReservationResult:
+    """
+    Atomically reserve all lines, or none of them.
+
+    Runs as one job on the database writer. If any line cannot be fulfilled
+    the job is rolled back and per-line results explain why. Lock contention
+    (e.g. from another process) is retried up to `max_attempts` times.
+    """
+    if not lines:
+        return ReservationResult(success=False, error="No items to reserve")
+
+    def job(conn: sqlite3.Connection) -> list[LineResult]:
+        results = _apply(conn, lines)
+        if not all(result.reserved for result in results):
+            # Roll back this job; nothing is reserved
+            raise _Rejected(results)
+        return results
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            results = write(job)
+            return ReservationResult(success=True, lines=results, attempts=attempt)
+        except _Rejected as rejected:
+            for result in rejected.results:
+                if result.reserved:
+                    # Rolled back along with the failing lines
+                    result.reserved = False
+            return ReservationResult(
+                success=False, lines=rejected.results, attempts=attempt
+            )
+        except sqlite3.OperationalError as e:
+            if not is_lock_error(e) or attempt == max_attempts:
+                return ReservationResult(
+                    success=False, attempts=attempt, error=f"Transaction failed: {e}"
+                )
+            delay = min(BASE_DELAY * 2 ** (attempt - 1), MAX_DELAY)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+    raise AssertionError("unreachable")
@@ -1,9 +1,33 @@
 """Stock/inventory repository."""
 
-from db.connection import execute, query_all, query_one
-from db.models import Stock, StockAvailability
+import os
+import sqlite3
+from collections.abc import Callable, Iterable, Mapping
+from datetime import datetime
+
+from db.connection import (
+    execute,
+    group_rows,
+    query_all,
+    query_in,
+    query_one,
+    write,
+)
+from db.models import (
+    Stock,
+    StockAvailability,
+    StockMovement,
+    parse_mg,
+    parse_unit_family,
+)
 from db.repositories import medications
 
+# Record stock changes as append-only movements instead of updating the
+# stock row in place; a background compactor folds them into the snapshot
+LEDGER_MODE = os.getenv("STOCK_LEDGER", "false").lower() == "true"
+
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 
 def _row_to_stock(row: dict, include_medication: bool = False) -> Stock:
     """Convert a database row to a Stock model."""
@@ -13,6 +37,8 @@ def _row_to_stock(row: dict, include_medication: bool = False) -> Stock:
         dosage=row["dosage"],
         quantity=row["quantity"],
         updated_at=row["updated_at"],
+        strength_mg=row["strength_mg"],
+        unit_family=row["unit_family"],
     )
     if include_medication:
         stock.medication = medications.get_by_id(row["medication_id"])
@@ -21,7 +47,7 @@ def _row_to_stock(row: dict, include_medication: bool = False) -> Stock:
 
 def get_by_id(stock_id: int, include_medication: bool = False) -> Stock | None:
     """Get a stock entry by ID."""
-    row = query_one("SELECT * FROM stock WHERE id = ?", (stock_id,))
+    row = query_one("SELECT * FROM stock_levels WHERE id = ?", (stock_id,))
     if not row:
         return None
     return _row_to_stock(row, include_medication)
@@ -35,17 +61,45 @@ def get_by_medication_id(
     """Get stock entries for a medication, optionally filtered by dosage."""
     if dosage:
         rows = query_all(
-            "SELECT * FROM stock WHERE medication_id = ? AND dosage = ?",
+            "SELECT * FROM stock_levels WHERE medication_id = ? AND dosage = ?",
             (medication_id, dosage),
         )
     else:
         rows = query_all(
-            "SELECT * FROM stock WHERE medication_id = ? ORDER BY dosage",
+            "SELECT * FROM stock_levels WHERE medication_id = ? "
+            "ORDER BY strength_mg IS NULL, strength_mg, dosage",
             (medication_id,),
         )
     return [_row_to_stock(row, include_medication) for row in rows]
 
 
+def get_by_strength(
+    medication_id: int,
+    min_mg: float | None = None,
+    max_mg: float | None = None,
+    unit_family: str = "mg",
+    in_stock_only: bool = False,
+) -> list[Stock]:
+    """
+    Get stock entries for a medication within a strength range, weakest first.
+
+    Only entries of the given unit family are returned, since strengths
+    of different families (e.g. "mg" vs "mg/ml") are not comparable.
+    """
+    sql = "SELECT * FROM stock_levels WHERE medication_id = ? AND unit_family = ?"
+    params: tuple = (medication_id, unit_family)
+    if min_mg is not None:
+        sql += " AND strength_mg >= ?"
+        params += (min_mg,)
+    if max_mg is not None:
+        sql += " AND strength_mg <= ?"
+        params += (max_mg,)
+    if in_stock_only:
+        sql += " AND quantity > 0"
+    rows = query_all(f"{sql} ORDER BY strength_mg, dosage", params)
+    return [_row_to_stock(row) for row in rows]
+
+
 def get_by_medication_name(
     name: str,
     dosage: str | None = None,
@@ -58,26 +112,17 @@ def get_by_medication_name(
     return get_by_medication_id(med.id, dosage, include_medication)
 
 
-def check_availability(
+def _build_availability(
     medication_id: int,
-    dosage: str | None = None,
+    dosage: str | None,
+    all_stock: list[Stock],
 ) -> StockAvailability:
-    """
-    Check stock availability for a medication/dosage.
-
-    Returns a StockAvailability with:
-    - exact_match: The stock entry if exact dosage found
-    - available_quantity: Quantity for the exact match
-    - alternatives: Other dosages available if no exact match or no dosage specified
-    """
+    """Build a StockAvailability from all stock entries of a medication."""
     result = StockAvailability(
         medication_id=medication_id,
         requested_dosage=dosage,
     )
 
-    # Get all stock for this medication
-    all_stock = get_by_medication_id(medication_id)
-
     if not all_stock:
         return result
 
@@ -97,32 +142,145 @@ def check_availability(
     return result
 
 
+def check_availability(
+    medication_id: int,
+    dosage: str | None = None,
+) -> StockAvailability:
+    """
+    Check stock availability for a medication/dosage.
+
+    Returns a StockAvailability with:
+    - exact_match: The stock entry if exact dosage found
+    - available_quantity: Quantity for the exact match
+    - alternatives: Other dosages available if no exact match or no dosage specified
+
+    With a dosage, alternatives are ordered by closeness to its strength
+    (same unit family first); otherwise from weakest to strongest.
+    """
+    if not dosage:
+        return _build_availability(
+            medication_id, dosage, get_by_medication_id(medication_id)
+        )
+
+    rows = query_all(
+        """
+        SELECT * FROM stock_levels WHERE medication_id = ?
+        ORDER BY
+            unit_family IS NOT ?,
+            strength_mg IS NULL,
+            ABS(strength_mg - ?),
+            strength_mg,
+            dosage
+        """,
+        (medication_id, parse_unit_family(dosage), parse_mg(dosage)),
+    )
+    return _build_availability(medication_id, dosage, [_row_to_stock(r) for r in rows])
+
+
+def check_availability_bulk(
+    medication_ids: Iterable[int],
+    dosages: Mapping[int, str | None] | None = None,
+) -> dict[int, StockAvailability]:
+    """
+    Check stock availability for many medications with a single query.
+
+    `dosages` optionally maps a medication id to its requested dosage.
+    Returns a StockAvailability (as check_availability would, including
+    the ordering of alternatives) for every requested id, including ids
+    with no stock at all.
+    """
+    ids = list(dict.fromkeys(medication_ids))
+    dosages = dosages or {}
+    rows = query_in(
+        "SELECT * FROM stock_levels WHERE medication_id IN ({placeholders}) "
+        "ORDER BY medication_id, strength_mg IS NULL, strength_mg, dosage",
+        ids,
+    )
+    by_medication = group_rows(rows, "medication_id")
+
+    results: dict[int, StockAvailability] = {}
+    for medication_id in ids:
+        dosage = dosages.get(medication_id)
+        all_stock = [_row_to_stock(row) for row in by_medication.get(medication_id, [])]
+        if dosage:
+            all_stock.sort(key=_closeness_key(dosage))
+        results[medication_id] = _build_availability(medication_id, dosage, all_stock)
+    return results
+
+
+def _closeness_key(dosage: str) -> Callable[[Stock], tuple]:
+    """Sort key ordering stock entries by closeness to a dosage's strength."""
+    target_mg = parse_mg(dosage)
+    family = parse_unit_family(dosage)
+
+    def key(item: Stock) -> tuple:
+        distance = (
+            abs(item.strength_mg - target_mg)
+            if item.strength_mg is not None and target_mg is not None
+            else 0.0
+        )
+        return (item.unit_family != family, item.strength_mg is None, distance)
+
+    return key
+
+
 def update_quantity(stock_id: int, quantity: int) -> bool:
     """Update the quantity for a stock entry."""
-    execute(
-        "UPDATE stock SET quantity = ?, updated_at = datetime('now') WHERE id = ?",
-        (quantity, stock_id),
-    )
+    if LEDGER_MODE:
+        # Record the difference from the current level as an adjustment
+        execute(
+            "INSERT INTO stock_movements (stock_id, delta, reason) "
+            "SELECT id, ? - quantity, 'adjustment' FROM stock_levels WHERE id = ?",
+            (quantity, stock_id),
+        )
+    else:
+        # Offset any movements not yet folded into the snapshot
+        execute(
+            "UPDATE stock SET quantity = ? - ("
+            "SELECT l.quantity - stock.quantity FROM stock_levels l WHERE l.id = stock.id"
+            "), updated_at = datetime('now') WHERE id = ?",
+            (quantity, stock_id),
+        )
     return True
 
 
+def remove_quantity(
+    conn: sqlite3.Connection,
+    stock_id: int,
+    amount: int,
+    reason: str = "reservation",
+) -> bool:
+    """
+    Take `amount` from a stock entry within a write job.
+
+    The availability check and the change happen in one statement, so
+    concurrent callers cannot oversell. Returns False, changing nothing,
+    if less than `amount` is available.
+    """
+    if LEDGER_MODE:
+        cursor = conn.execute(
+            "INSERT INTO stock_movements (stock_id, delta, reason) "
+            "SELECT id, -?, ? FROM stock_levels WHERE id = ? AND quantity >= ?",
+            (amount, reason, stock_id, amount),
+        )
+    else:
+        cursor = conn.execute(
+            "UPDATE stock SET quantity = quantity - ?, updated_at = datetime('now') "
+            "WHERE id = ? AND (SELECT quantity FROM stock_levels WHERE id = ?) >= ?",
+            (amount, stock_id, stock_id, amount),
+        )
+    return cursor.rowcount > 0
+
+
 def decrement(stock_id: int, amount: int = 1) -> bool:
     """Decrement stock quantity by amount. Returns False if insufficient stock."""
-    row = query_one("SELECT quantity FROM stock WHERE id = ?", (stock_id,))
-    if not row or row["quantity"] < amount:
-        return False
-
-    execute(
-        "UPDATE stock SET quantity = quantity - ?, updated_at = datetime('now') WHERE id = ?",
-        (amount, stock_id),
-    )
-    return True
+    return write(lambda conn: remove_quantity(conn, stock_id, amount, "decrement"))
 
 
 def get_low_stock(threshold: int = 10, include_medication: bool = False) -> list[Stock]:
     """Get all stock entries with quantity below threshold."""
     rows = query_all(
-        "SELECT * FROM stock WHERE quantity <= ? ORDER BY quantity",
+        "SELECT * FROM stock_levels WHERE quantity <= ? ORDER BY quantity",
         (threshold,),
     )
     return [_row_to_stock(row, include_medication) for row in rows]
@@ -130,5 +288,112 @@ def get_low_stock(threshold: int = 10, include_medication: bool = False) -> list
 
 def get_all(include_medication: bool = False) -> list[Stock]:
     """Get all stock entries."""
-    rows = query_all("SELECT * FROM stock ORDER BY medication_id, dosage")
+    rows = query_all("SELECT * FROM stock_levels ORDER BY medication_id, dosage")
     return [_row_to_stock(row, include_medication) for row in rows]
+
+
+def _row_to_movement(row: dict) -> StockMovement:
+    """Convert a database row to a StockMovement model."""
+    return StockMovement(
+        id=row["id"],
+        stock_id=row["stock_id"],
+        delta=row["delta"],
+        reason=row["reason"],
+        created_at=row["created_at"],
+    )
+
+
+def _time_range(since: datetime, until: datetime | None) -> tuple[str, str]:
+    """Format a [since, until) range for comparison with created_at."""
+    until = until or datetime.max
+    return since.strftime(_TIMESTAMP_FORMAT), until.strftime(_TIMESTAMP_FORMAT)
+
+
+def get_movements(
+    since: datetime,
+    until: datetime | None = None,
+    stock_id: int | None = None,
+) -> list[StockMovement]:
+    """Get ledger movements created in [since, until) (UTC), oldest first."""
+    start, end = _time_range(since, until)
+    sql = "SELECT * FROM stock_movements WHERE created_at >= ? AND created_at < ?"
+    params: tuple = (start, end)
+    if stock_id is not None:
+        sql += " AND stock_id = ?"
+        params += (stock_id,)
+    rows = query_all(f"{sql} ORDER BY id", params)
+    return [_row_to_movement(row) for row in rows]
+
+
+def get_movement_totals(
+    since: datetime,
+    until: datetime | None = None,
+) -> list[dict]:
+    """
+    Summarize ledger movements created in [since, until) (UTC) per stock entry.
+
+    Each row has stock_id, medication_id, dosage, movements, removed, added
+    and net, ordered by the most removed first.
+    """
+    start, end = _time_range(since, until)
+    return query_all(
+        """
+        SELECT
+            m.stock_id,
+            s.medication_id,
+            s.dosage,
+            COUNT(*) AS movements,
+            -SUM(MIN(m.delta, 0)) AS removed,
+            SUM(MAX(m.delta, 0)) AS added,
+            SUM(m.delta) AS net
+        FROM stock_movements m
+        JOIN stock s ON s.id = m.stock_id
+        WHERE m.created_at >= ? AND m.created_at < ?
+        GROUP BY m.stock_id
+        ORDER BY removed DESC, m.stock_id
+        """,
+        (start, end),
+    )
+
+
+def compact_movements() -> int:
+    """
+    Fold unapplied ledger movements into the stock snapshot.
+
+    Movements themselves are kept; only the applied watermark advances.
+    Returns the number of movements folded in.
+    """
+
+    def job(conn: sqlite3.Connection) -> int:
+        applied = conn.execute(
+            "SELECT applied_through FROM stock_ledger WHERE id = 1"
+        ).fetchone()[0]
+        pending = conn.execute(
+            "SELECT MAX(id) AS latest, COUNT(*) AS count "
+            "FROM stock_movements WHERE id > ?",
+            (applied,),
+        ).fetchone()
+        if not pending["count"]:
+            return 0
+        conn.execute(
+            """
+            UPDATE stock SET
+                quantity = quantity + pending.delta,
+                updated_at = pending.last_at
+            FROM (
+                SELECT stock_id, SUM(delta) AS delta, MAX(created_at) AS last_at
+                FROM stock_movements
+                WHERE id > ? AND id <= ?
+                GROUP BY stock_id
+            ) AS pending
+            WHERE stock.id = pending.stock_id
+            """,
+            (applied, pending["latest"]),
+        )
+        conn.execute(
+            "UPDATE stock_ledger SET applied_through = ? WHERE id = 1",
+            (pending["latest"],),
+        )
+        return pending["count"]
+
+    return write(job)
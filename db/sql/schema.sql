@@ -9,14 +9,19 @@ CREATE TABLE IF NOT EXISTS medications (
     description_he TEXT,
     price REAL,
     requires_prescription INTEGER NOT NULL DEFAULT 0,
-    created_at TEXT NOT NULL DEFAULT (datetime('now'))
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    -- Normalized lookup keys (see the key triggers below)
+    name_en_key TEXT,
+    name_he_key TEXT
 );
 
 -- Active ingredients
 CREATE TABLE IF NOT EXISTS ingredients (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name_en TEXT NOT NULL UNIQUE,
-    name_he TEXT
+    name_he TEXT,
+    name_en_key TEXT,
+    name_he_key TEXT
 );
 
 -- Junction table for medication <-> ingredients (many-to-many)
@@ -35,6 +40,9 @@ CREATE TABLE IF NOT EXISTS stock (
     dosage TEXT,
     quantity INTEGER NOT NULL DEFAULT 0,
     updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    -- Parsed dosage strength (maintained by triggers via dosage_strengths)
+    strength_mg REAL,
+    unit_family TEXT,
     UNIQUE (medication_id, dosage),
     FOREIGN KEY (medication_id) REFERENCES medications(id) ON DELETE CASCADE
 );
@@ -57,6 +65,8 @@ CREATE TABLE IF NOT EXISTS prescriptions (
     months_fulfilled INTEGER NOT NULL DEFAULT 0,
     created_at TEXT NOT NULL DEFAULT (datetime('now')),
     expires_at TEXT,
+    strength_mg REAL,
+    unit_family TEXT,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (medication_id) REFERENCES medications(id) ON DELETE CASCADE
 );
@@ -72,6 +82,9 @@ CREATE TABLE IF NOT EXISTS dosage_instructions (
     max_daily TEXT,
     instructions TEXT,
     warnings TEXT,
+    dosage_key TEXT,
+    strength_mg REAL,
+    unit_family TEXT,
     UNIQUE (medication_id, dosage),
     FOREIGN KEY (medication_id) REFERENCES medications(id) ON DELETE CASCADE
 );
@@ -80,7 +93,420 @@ CREATE TABLE IF NOT EXISTS dosage_instructions (
 CREATE INDEX IF NOT EXISTS idx_medications_name_en ON medications(name_en);
 CREATE INDEX IF NOT EXISTS idx_medications_name_he ON medications(name_he);
 CREATE INDEX IF NOT EXISTS idx_ingredients_name_en ON ingredients(name_en);
+CREATE INDEX IF NOT EXISTS idx_medication_ingredients_ingredient_id ON medication_ingredients(ingredient_id, medication_id);
 CREATE INDEX IF NOT EXISTS idx_stock_medication_id ON stock(medication_id);
 CREATE INDEX IF NOT EXISTS idx_prescriptions_user_id ON prescriptions(user_id);
 CREATE INDEX IF NOT EXISTS idx_prescriptions_medication_id ON prescriptions(medication_id);
 CREATE INDEX IF NOT EXISTS idx_dosage_instructions_medication_id ON dosage_instructions(medication_id);
+
+-- Normalized lookup keys: case-folded, diacritic-free names/dosages.
+-- Computed in Python (db.models.normalize_name), so SQL can't derive them:
+-- the triggers below only clear a key when its source column changes, and
+-- rows inserted without keys get them from fill_name_keys() in db.migrations.
+-- init_db runs it, and so do name lookups that miss after the catalog
+-- changed (medications.sync_name_keys()).
+CREATE INDEX IF NOT EXISTS idx_medications_name_en_key ON medications(name_en_key);
+CREATE INDEX IF NOT EXISTS idx_medications_name_he_key ON medications(name_he_key);
+CREATE INDEX IF NOT EXISTS idx_ingredients_name_en_key ON ingredients(name_en_key);
+CREATE INDEX IF NOT EXISTS idx_ingredients_name_he_key ON ingredients(name_he_key);
+CREATE INDEX IF NOT EXISTS idx_dosage_instructions_dosage_key ON dosage_instructions(medication_id, dosage_key);
+
+CREATE TRIGGER IF NOT EXISTS trg_medications_name_en_key_update
+AFTER UPDATE OF name_en ON medications
+BEGIN
+    UPDATE medications SET name_en_key = NULL WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medications_name_he_key_update
+AFTER UPDATE OF name_he ON medications
+BEGIN
+    UPDATE medications SET name_he_key = NULL WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_name_en_key_update
+AFTER UPDATE OF name_en ON ingredients
+BEGIN
+    UPDATE ingredients SET name_en_key = NULL WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_name_he_key_update
+AFTER UPDATE OF name_he ON ingredients
+BEGIN
+    UPDATE ingredients SET name_he_key = NULL WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dosage_instructions_key_update
+AFTER UPDATE OF dosage ON dosage_instructions
+BEGIN
+    UPDATE dosage_instructions SET dosage_key = NULL WHERE id = NEW.id;
+END;
+
+-- Parsed dosage strengths: milligrams plus unit family ("mg", "mg/ml", ...),
+-- so strengths can be filtered and compared in SQL. Parsed in plain SQL with
+-- the same rules as db.models.dosage.parse_mg()/parse_unit_family(), so rows
+-- written by any SQLite client (not just this app) get their strength filled
+-- in by the triggers below. Each nested step peels off one part of the text.
+CREATE VIEW IF NOT EXISTS dosage_strengths AS
+SELECT
+    source,
+    id,
+    CASE unit
+        WHEN 'g' THEN CAST(dosage_text AS REAL) * 1000
+        WHEN 'mg' THEN CAST(dosage_text AS REAL)
+        WHEN 'mcg' THEN CAST(dosage_text AS REAL) * 0.001
+        WHEN 'ug' THEN CAST(dosage_text AS REAL) * 0.001
+    END AS strength_mg,
+    CASE
+        WHEN unit IS NULL THEN NULL
+        WHEN per_unit <> '' THEN 'mg/' || per_unit
+        ELSE 'mg'
+    END AS unit_family
+FROM (
+    -- Per-volume unit letters, e.g. "ml" in "25mg/5ml"
+    SELECT
+        source,
+        id,
+        dosage_text,
+        unit,
+        CASE WHEN per LIKE '/%' THEN substr(
+            per_amount, 1,
+            length(per_amount) - length(ltrim(per_amount, 'abcdefghijklmnopqrstuvwxyz'))
+        ) ELSE '' END AS per_unit
+    FROM (
+        -- Whatever follows "/" and its optional count ("ml" in "/5ml")
+        SELECT
+            source,
+            id,
+            dosage_text,
+            unit,
+            per,
+            ltrim(ltrim(ltrim(substr(per, 2), ' ' || char(9)), '0123456789.'), ' ' || char(9))
+                AS per_amount
+        FROM (
+            -- Text after the unit ("/5ml" in "25mg/5ml")
+            SELECT
+                source,
+                id,
+                dosage_text,
+                unit,
+                ltrim(substr(after_amount, length(unit) + 1), ' ' || char(9)) AS per
+            FROM (
+                -- Unit right after the leading amount (mcg/ug before bare g)
+                SELECT
+                    source,
+                    id,
+                    dosage_text,
+                    after_amount,
+                    CASE
+                        WHEN dosage_text NOT GLOB '[0-9.]*' THEN NULL
+                        WHEN after_amount LIKE 'mg%' THEN 'mg'
+                        WHEN after_amount LIKE 'mcg%' THEN 'mcg'
+                        WHEN after_amount LIKE 'ug%' THEN 'ug'
+                        WHEN after_amount LIKE 'g%' THEN 'g'
+                    END AS unit
+                FROM (
+                    SELECT
+                        source,
+                        id,
+                        dosage_text,
+                        ltrim(ltrim(dosage_text, '0123456789.'), ' ' || char(9)) AS after_amount
+                    FROM (
+                        SELECT source, id, lower(trim(dosage, ' ' || char(9, 10, 13))) AS dosage_text
+                        FROM (
+                            SELECT 'stock' AS source, id, dosage FROM stock
+                            UNION ALL
+                            SELECT 'prescriptions', id, dosage FROM prescriptions
+                            UNION ALL
+                            SELECT 'dosage_instructions', id, dosage FROM dosage_instructions
+                        )
+                    )
+                )
+            )
+        )
+    )
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_strength ON stock(medication_id, strength_mg);
+CREATE INDEX IF NOT EXISTS idx_dosage_instructions_strength ON dosage_instructions(medication_id, strength_mg);
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_strength_insert
+AFTER INSERT ON stock
+BEGIN
+    UPDATE stock
+    SET (strength_mg, unit_family) = (
+        SELECT strength_mg, unit_family FROM dosage_strengths
+        WHERE source = 'stock' AND id = NEW.id
+    )
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_strength_update
+AFTER UPDATE OF dosage ON stock
+BEGIN
+    UPDATE stock
+    SET (strength_mg, unit_family) = (
+        SELECT strength_mg, unit_family FROM dosage_strengths
+        WHERE source = 'stock' AND id = NEW.id
+    )
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_prescriptions_strength_insert
+AFTER INSERT ON prescriptions
+BEGIN
+    UPDATE prescriptions
+    SET (strength_mg, unit_family) = (
+        SELECT strength_mg, unit_family FROM dosage_strengths
+        WHERE source = 'prescriptions' AND id = NEW.id
+    )
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_prescriptions_strength_update
+AFTER UPDATE OF dosage ON prescriptions
+BEGIN
+    UPDATE prescriptions
+    SET (strength_mg, unit_family) = (
+        SELECT strength_mg, unit_family FROM dosage_strengths
+        WHERE source = 'prescriptions' AND id = NEW.id
+    )
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dosage_instructions_strength_insert
+AFTER INSERT ON dosage_instructions
+BEGIN
+    UPDATE dosage_instructions
+    SET (strength_mg, unit_family) = (
+        SELECT strength_mg, unit_family FROM dosage_strengths
+        WHERE source = 'dosage_instructions' AND id = NEW.id
+    )
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dosage_instructions_strength_update
+AFTER UPDATE OF dosage ON dosage_instructions
+BEGIN
+    UPDATE dosage_instructions
+    SET (strength_mg, unit_family) = (
+        SELECT strength_mg, unit_family FROM dosage_strengths
+        WHERE source = 'dosage_instructions' AND id = NEW.id
+    )
+    WHERE id = NEW.id;
+END;
+
+-- Full-text search (FTS5, trigram tokenizer: case-insensitive substring matching)
+-- External-content tables kept in sync with the catalog by the triggers below.
+-- Rebuild with db.repositories.medications.rebuild_search_index().
+CREATE VIRTUAL TABLE IF NOT EXISTS medications_fts USING fts5(
+    name_en, name_he, description_en, description_he,
+    content = 'medications', content_rowid = 'id', tokenize = 'trigram'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS ingredients_fts USING fts5(
+    name_en, name_he,
+    content = 'ingredients', content_rowid = 'id', tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_medications_fts_insert
+AFTER INSERT ON medications
+BEGIN
+    INSERT INTO medications_fts (rowid, name_en, name_he, description_en, description_he)
+    VALUES (NEW.id, NEW.name_en, NEW.name_he, NEW.description_en, NEW.description_he);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medications_fts_delete
+AFTER DELETE ON medications
+BEGIN
+    INSERT INTO medications_fts (medications_fts, rowid, name_en, name_he, description_en, description_he)
+    VALUES ('delete', OLD.id, OLD.name_en, OLD.name_he, OLD.description_en, OLD.description_he);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medications_fts_update
+AFTER UPDATE OF name_en, name_he, description_en, description_he ON medications
+BEGIN
+    INSERT INTO medications_fts (medications_fts, rowid, name_en, name_he, description_en, description_he)
+    VALUES ('delete', OLD.id, OLD.name_en, OLD.name_he, OLD.description_en, OLD.description_he);
+    INSERT INTO medications_fts (rowid, name_en, name_he, description_en, description_he)
+    VALUES (NEW.id, NEW.name_en, NEW.name_he, NEW.description_en, NEW.description_he);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_fts_insert
+AFTER INSERT ON ingredients
+BEGIN
+    INSERT INTO ingredients_fts (rowid, name_en, name_he)
+    VALUES (NEW.id, NEW.name_en, NEW.name_he);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_fts_delete
+AFTER DELETE ON ingredients
+BEGIN
+    INSERT INTO ingredients_fts (ingredients_fts, rowid, name_en, name_he)
+    VALUES ('delete', OLD.id, OLD.name_en, OLD.name_he);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_fts_update
+AFTER UPDATE OF name_en, name_he ON ingredients
+BEGIN
+    INSERT INTO ingredients_fts (ingredients_fts, rowid, name_en, name_he)
+    VALUES ('delete', OLD.id, OLD.name_en, OLD.name_he);
+    INSERT INTO ingredients_fts (rowid, name_en, name_he)
+    VALUES (NEW.id, NEW.name_en, NEW.name_he);
+END;
+
+-- Catalog version: bumped on any change to catalog tables so in-process
+-- indexes and caches can cheaply detect that they are stale
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_medications_version_insert AFTER INSERT ON medications
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_medications_version_update AFTER UPDATE ON medications
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_medications_version_delete AFTER DELETE ON medications
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_version_insert AFTER INSERT ON ingredients
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_version_update AFTER UPDATE ON ingredients
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_version_delete AFTER DELETE ON ingredients
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medication_ingredients_version_insert AFTER INSERT ON medication_ingredients
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_medication_ingredients_version_update AFTER UPDATE ON medication_ingredients
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_medication_ingredients_version_delete AFTER DELETE ON medication_ingredients
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dosage_instructions_version_insert AFTER INSERT ON dosage_instructions
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_dosage_instructions_version_update AFTER UPDATE ON dosage_instructions
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_dosage_instructions_version_delete AFTER DELETE ON dosage_instructions
+BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END;
+
+-- Stock ledger (STOCK_LEDGER mode): reservations append movements instead of
+-- updating the stock row in place. stock.quantity is the compacted snapshot;
+-- movements after stock_ledger.applied_through are deltas not yet folded in
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stock_id INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (stock_id) REFERENCES stock(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_stock_id ON stock_movements(stock_id, id);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_created_at ON stock_movements(created_at);
+
+CREATE TABLE IF NOT EXISTS stock_ledger (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    applied_through INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO stock_ledger (id, applied_through) VALUES (1, 0);
+
+-- Current stock: snapshot plus unapplied movements
+CREATE VIEW IF NOT EXISTS stock_levels AS
+SELECT
+    s.id,
+    s.medication_id,
+    s.dosage,
+    s.quantity + COALESCE((
+        SELECT SUM(m.delta) FROM stock_movements m
+        WHERE m.stock_id = s.id
+        AND m.id > (SELECT applied_through FROM stock_ledger WHERE id = 1)
+    ), 0) AS quantity,
+    s.updated_at,
+    s.strength_mg,
+    s.unit_family
+FROM stock s;
+
+-- Medication cards: denormalized per-medication JSON document (catalog fields
+-- and ingredients) for single-lookup reads. Cards are rebuilt from
+-- medication_card_source by the triggers below whenever the catalog changes.
+-- Stock levels are not part of the card: they change on every reservation, so
+-- readers merge them in from stock_levels instead.
+CREATE TABLE IF NOT EXISTS medication_cards (
+    medication_id INTEGER PRIMARY KEY,
+    name_en_key TEXT,
+    name_he_key TEXT,
+    card TEXT NOT NULL,
+    FOREIGN KEY (medication_id) REFERENCES medications(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_medication_cards_name_en_key ON medication_cards(name_en_key);
+CREATE INDEX IF NOT EXISTS idx_medication_cards_name_he_key ON medication_cards(name_he_key);
+
+CREATE VIEW IF NOT EXISTS medication_card_source AS
+SELECT
+    m.id AS medication_id,
+    m.name_en_key,
+    m.name_he_key,
+    json_object(
+        'id', m.id,
+        'name_en', m.name_en,
+        'name_he', m.name_he,
+        'description_en', m.description_en,
+        'description_he', m.description_he,
+        'price', m.price,
+        'requires_prescription', json(CASE WHEN m.requires_prescription THEN 'true' ELSE 'false' END),
+        'ingredients', (
+            SELECT json_group_array(json_object('id', id, 'name_en', name_en, 'name_he', name_he))
+            FROM (
+                SELECT i.id, i.name_en, i.name_he
+                FROM medication_ingredients mi
+                JOIN ingredients i ON i.id = mi.ingredient_id
+                WHERE mi.medication_id = m.id
+                ORDER BY i.id
+            )
+        )
+    ) AS card
+FROM medications m;
+
+CREATE TRIGGER IF NOT EXISTS trg_medications_card_insert AFTER INSERT ON medications
+BEGIN
+    INSERT OR REPLACE INTO medication_cards
+    SELECT * FROM medication_card_source WHERE medication_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medications_card_update AFTER UPDATE ON medications
+BEGIN
+    INSERT OR REPLACE INTO medication_cards
+    SELECT * FROM medication_card_source WHERE medication_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medication_ingredients_card_insert AFTER INSERT ON medication_ingredients
+BEGIN
+    INSERT OR REPLACE INTO medication_cards
+    SELECT * FROM medication_card_source WHERE medication_id = NEW.medication_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medication_ingredients_card_update AFTER UPDATE ON medication_ingredients
+BEGIN
+    INSERT OR REPLACE INTO medication_cards
+    SELECT * FROM medication_card_source
+    WHERE medication_id IN (OLD.medication_id, NEW.medication_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_medication_ingredients_card_delete AFTER DELETE ON medication_ingredients
+BEGIN
+    INSERT OR REPLACE INTO medication_cards
+    SELECT * FROM medication_card_source WHERE medication_id = OLD.medication_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ingredients_card_update AFTER UPDATE OF name_en, name_he ON ingredients
+BEGIN
+    INSERT OR REPLACE INTO medication_cards
+    SELECT * FROM medication_card_source
+    WHERE medication_id IN (
+        SELECT medication_id FROM medication_ingredients WHERE ingredient_id = NEW.id
+    );
+END;
@@ -1,26 +1,61 @@
+import logging
+import time
+
 import chainlit as cl
 
-from agent import InputMessage, StreamEvent, chat
+from agent import InputMessage, ResponseChain, chat, compact_history
+from db import equivalence, fuzzy, ledger, medications
+from db.connection import run_in_db
+
+logger = logging.getLogger(__name__)
 
 
 @cl.on_chat_start
 async def on_chat_start() -> None:
     """Initialize conversation history when a new chat starts."""
     cl.user_session.set("messages", [])
+    cl.user_session.set("response_chain", None)
+    # Key catalog rows added outside the app, then build (or catch up) the
+    # in-memory catalog indexes before the first lookup
+    await run_in_db(medications.sync_name_keys)
+    await fuzzy.arefresh()
+    await equivalence.arefresh()
+    # Fold stock ledger movements in the background (ledger mode only)
+    ledger.start()
 
 
 @cl.on_message
 async def on_message(message: cl.Message) -> None:
     """Handle incoming user messages."""
+    started = time.perf_counter()
     messages: list[InputMessage] = cl.user_session.get("messages") or []
+    chain: ResponseChain | None = cl.user_session.get("response_chain")
 
     messages.append({"role": "user", "content": message.content})
 
-    text_events: list[StreamEvent] = []
+    # Keep the prompt size roughly flat as the session grows
+    messages, compaction = compact_history(messages)
+    if compaction.tokens_saved:
+        logger.info(
+            "History compacted: %d -> %d tokens (saved %d, %d outputs truncated, "
+            "%d items dropped)",
+            compaction.tokens_before,
+            compaction.tokens_after,
+            compaction.tokens_saved,
+            compaction.truncated_outputs,
+            compaction.dropped_items,
+        )
+        # The server-side chain still holds the full history; start a new one
+        chain = None
+
+    # Created lazily on the first text delta, then streamed token by token
+    msg: cl.Message | None = None
+    full_response = ""
     thinking_step: cl.Step | None = None
     final_messages: list[InputMessage] = messages
+    final_chain: ResponseChain | None = None
 
-    async for event in chat(messages):
+    async for event in chat(messages, chain):
         if event.type == "reasoning":
             # Start thinking step if not already started
             if thinking_step is None:
@@ -43,16 +78,31 @@ async def on_message(message: cl.Message) -> None:
                 tool_step.output = event.tool_result or ""
 
         elif event.type == "text":
-            text_events.append(event)
+            if msg is None:
+                if thinking_step is not None:
+                    await thinking_step.__aexit__(None, None, None)
+                    thinking_step = None
+                msg = cl.Message(content="")
+                await msg.send()
+                logger.info(
+                    "Time to first visible token: %.0f ms",
+                    (time.perf_counter() - started) * 1000,
+                )
+            full_response += event.content
+            await msg.stream_token(event.content)
 
         elif event.type == "done":
             # Capture the final messages including tool calls
             if event.messages:
                 final_messages = event.messages
+            final_chain = event.chain
 
         elif event.type == "error":
             if thinking_step is not None:
                 await thinking_step.__aexit__(None, None, None)
+            # Finalize any partially streamed answer before reporting the error
+            if msg is not None:
+                await msg.update()
             await cl.ErrorMessage(content=event.content).send()
             return
 
@@ -60,18 +110,13 @@ async def on_message(message: cl.Message) -> None:
     if thinking_step is not None:
         await thinking_step.__aexit__(None, None, None)
 
-    # Stream the text response
-    msg = cl.Message(content="")
-    await msg.send()
-
-    full_response = ""
-    for event in text_events:
-        full_response += event.content
-        await msg.stream_token(event.content)
-
+    if msg is None:
+        msg = cl.Message(content="")
+        await msg.send()
     await msg.update()
 
     # Add the assistant's text response to messages
     final_messages.append({"role": "assistant", "content": full_response})
 
     cl.user_session.set("messages", final_messages)
+    cl.user_session.set("response_chain", final_chain)
@@ -0,0 +1,31 @@
+import os
+from collections.abc import Iterator
+
+import pytest
+
+from db import connection, medications
+
+# agent.agent creates its OpenAI client on import; tests point it at a fake
+# server (see fake_responses) and never reach the real API
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Point the app at a fresh seeded database in a temporary directory."""
+    monkeypatch.setattr(connection, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(connection, "DATABASE_PATH", tmp_path / "pharmacy.db")
+    connection.close_pool()
+    connection.close_writer()
+    connection.init_db(seed=True)
+    # The lookup cache is process-wide; don't serve another test's catalog
+    medications.clear_cache()
+    yield
+    connection.close_pool()
+    connection.close_writer()
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    """Run `pytest.mark.anyio` tests (anyio's plugin, via openai) on asyncio."""
+    return "asyncio"
@@ -0,0 +1,349 @@
+"""
+Fake streaming OpenAI Responses API server, for running the agent offline.
+
+Speaks just enough of `POST /v1/responses` with `stream: true` for the
+official client and the agent loop: output_item.added/done, function call
+argument deltas, reasoning summary and text deltas, and response.completed.
+Responses are remembered so `previous_response_id` chaining works; an
+unknown id gets the API's 404, which exercises the chain-lost fallback.
+
+What the "model" does each round is decided by a policy that sees the
+whole conversation. The default one calls tools typed as commands, one per
+line, e.g. `get_medication_stock {"medication_name": "Advil"}`, and answers
+with a summary once their outputs come back; anything else is echoed.
+
+Run standalone and point the app at it:
+
+    uv run python -m tests.fake_responses --port 8000
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=unused uv run chainlit run main.py
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Self
+
+
+@dataclass(frozen=True)
+class FunctionCall:
+    """A tool call the fake model makes."""
+
+    name: str
+    arguments: dict[str, Any]
+
+
+# One model round: answer text, or tool calls to make (run in parallel)
+type Turn = str | list[FunctionCall]
+# Decides a round from the full conversation (chained items included)
+type Policy = Callable[[list[dict[str, Any]]], Turn]
+
+
+def _text(item: dict[str, Any]) -> str:
+    """Plain text of a message item (string or content-part list)."""
+    content = item.get("content", "")
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content)
+
+
+def command_policy(conversation: list[dict[str, Any]]) -> Turn:
+    """
+    Call the tools named in the last user message, then summarize.
+
+    Each line of the form `<tool_name> <JSON arguments>` becomes one call;
+    a user message with no such line is echoed back.
+    """
+    last = conversation[-1]
+    if last.get("type") == "function_call_output":
+        outputs: list[str] = []
+        for item in reversed(conversation):
+            if item.get("type") != "function_call_output":
+                break
+            outputs.append(item["output"])
+        return "Tool results:\n" + "\n".join(reversed(outputs))
+
+    text = _text(last)
+    calls: list[FunctionCall] = []
+    for line in text.splitlines():
+        name, _, arguments = line.strip().partition(" ")
+        if name.isidentifier() and arguments.startswith("{"):
+            try:
+                calls.append(FunctionCall(name, json.loads(arguments)))
+            except json.JSONDecodeError:
+                pass
+    return calls or f"You said: {text}"
+
+
+def _chunks(text: str, size: int = 8) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+class FakeResponsesServer:
+    """
+    Threaded HTTP server implementing streamed `POST /v1/responses`.
+
+    Use as a context manager (or start()/stop()) and point an OpenAI client
+    at `base_url`. `requests` records every request body received.
+    """
+
+    def __init__(
+        self,
+        policy: Policy = command_policy,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.policy = policy
+        # Seconds each round "thinks" before its first event
+        self.latency = latency
+        self.requests: list[dict[str, Any]] = []
+        # Response ID -> conversation as of the end of that response
+        self._responses: dict[str, list[dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """OpenAI client base URL for this server."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> Self:
+        """Serve from a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self) -> None:
+        """Serve from the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def forget_responses(self) -> None:
+        """Drop stored responses, as if they expired server-side."""
+        with self._lock:
+            self._responses.clear()
+
+    def _next_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids):06d}"
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/responses"):
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+                server._respond(self, body)
+
+            def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _respond(self, handler: Any, body: dict[str, Any]) -> None:
+        with self._lock:
+            self.requests.append(body)
+            previous_id = body.get("previous_response_id")
+            history = self._responses.get(previous_id) if previous_id else []
+
+        if history is None:
+            handler._send_json(
+                404,
+                {
+                    "error": {
+                        "message": f"Previous response with id '{previous_id}' not found.",
+                        "type": "invalid_request_error",
+                        "param": "previous_response_id",
+                        "code": "previous_response_not_found",
+                    }
+                },
+            )
+            return
+
+        items = body.get("input", [])
+        if isinstance(items, str):
+            items = [{"role": "user", "content": items}]
+        conversation = [*history, *items]
+
+        if self.latency:
+            time.sleep(self.latency)
+        turn = self.policy(conversation)
+
+        response_id = self._next_id("resp")
+        output = self._output_items(turn)
+        with self._lock:
+            self._responses[response_id] = [*conversation, *output]
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        sequence = itertools.count()
+        for event in self._events(response_id, body, output):
+            event["sequence_number"] = next(sequence)
+            try:
+                handler.wfile.write(
+                    f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+                )
+                handler.wfile.flush()
+            except ConnectionError:
+                # Client stopped reading (e.g. a cancelled stream)
+                return
+
+    def _output_items(self, turn: Turn) -> list[dict[str, Any]]:
+        """Completed output items for a round."""
+        if isinstance(turn, str):
+            return [
+                {
+                    "type": "message",
+                    "id": self._next_id("msg"),
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [
+                        {"type": "output_text", "text": turn, "annotations": []}
+                    ],
+                }
+            ]
+        items: list[dict[str, Any]] = []
+        for call in turn:
+            item_id = self._next_id("fc")
+            items.append(
+                {
+                    "type": "function_call",
+                    "id": item_id,
+                    "call_id": f"call_{item_id}",
+                    "name": call.name,
+                    "arguments": json.dumps(call.arguments),
+                    "status": "completed",
+                }
+            )
+        return items
+
+    def _events(
+        self, response_id: str, body: dict[str, Any], output: list[dict[str, Any]]
+    ) -> Iterator[dict[str, Any]]:
+        """Server-sent events streaming `output` as one response."""
+        response = {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "fake"),
+            "status": "in_progress",
+            "output": [],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": body.get("tools", []),
+            "previous_response_id": body.get("previous_response_id"),
+        }
+        yield {"type": "response.created", "response": response}
+
+        reasoning_id = self._next_id("rs")
+        yield {
+            "type": "response.reasoning_summary_text.delta",
+            "item_id": reasoning_id,
+            "output_index": 0,
+            "summary_index": 0,
+            "delta": "Thinking about the request.",
+        }
+
+        for index, item in enumerate(output, start=1):
+            if item["type"] == "function_call":
+                yield {
+                    "type": "response.output_item.added",
+                    "output_index": index,
+                    "item": {**item, "arguments": "", "status": "in_progress"},
+                }
+                for delta in _chunks(item["arguments"]):
+                    yield {
+                        "type": "response.function_call_arguments.delta",
+                        "item_id": item["id"],
+                        "output_index": index,
+                        "delta": delta,
+                    }
+                yield {
+                    "type": "response.function_call_arguments.done",
+                    "item_id": item["id"],
+                    "output_index": index,
+                    "arguments": item["arguments"],
+                }
+            else:
+                yield {
+                    "type": "response.output_item.added",
+                    "output_index": index,
+                    "item": {**item, "content": [], "status": "in_progress"},
+                }
+                for delta in _chunks(item["content"][0]["text"]):
+                    yield {
+                        "type": "response.output_text.delta",
+                        "item_id": item["id"],
+                        "output_index": index,
+                        "content_index": 0,
+                        "delta": delta,
+                        "logprobs": [],
+                    }
+            yield {
+                "type": "response.output_item.done",
+                "output_index": index,
+                "item": item,
+            }
+
+        yield {
+            "type": "response.completed",
+            "response": {**response, "status": "completed", "output": output},
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake streaming Responses API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per round")
+    args = parser.parse_args()
+
+    server = FakeResponsesServer(latency=args.latency, host=args.host, port=args.port)
+    print(f"Serving fake Responses API at {server.base_url} (Ctrl+C to stop)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from openai import AsyncOpenAI
+
+from agent import agent
+from tests.fake_responses import FakeResponsesServer
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("database")]
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeResponsesServer]:
+    """Fake Responses server the agent's client is pointed at."""
+    with FakeResponsesServer() as fake:
+        monkeypatch.setattr(
+            agent, "client", AsyncOpenAI(base_url=fake.base_url, api_key="test")
+        )
+        yield fake
+
+
+async def _turn(
+    messages: list[Any], chain: agent.ResponseChain | None = None
+) -> list[agent.StreamEvent]:
+    return [event async for event in agent.chat(messages, chain)]
+
+
+def _user(text: str) -> dict[str, str]:
+    return {"role": "user", "content": text}
+
+
+async def test_tool_round_then_answer(server: FakeResponsesServer):
+    events = await _turn([_user('get_medication_stock {"medication_name": "Advil"}')])
+
+    assert [e.type for e in events if e.type == "error"] == []
+    (call,) = [e for e in events if e.type == "tool_call"]
+    assert call.tool_name == "get_medication_stock"
+    assert json.loads(call.tool_result)["found"] is True
+
+    text = "".join(e.content for e in events if e.type == "text")
+    assert text.startswith("Tool results:")
+    done = events[-1]
+    assert done.type == "done"
+    assert [m.get("type") for m in done.messages[1:]] == [
+        "function_call",
+        "function_call_output",
+    ]
+    # Second round resent the whole history, call and output included
+    assert len(server.requests) == 2
+    assert len(server.requests[1]["input"]) == 3
+
+
+async def test_parallel_calls_keep_call_order(server: FakeResponsesServer):
+    names = ["Advil", "Acamol", "Nurofen"]
+    command = "\n".join(
+        f'get_medication_stock {{"medication_name": "{name}"}}' for name in names
+    )
+    events = await _turn([_user(command)])
+
+    calls = [e for e in events if e.type == "tool_call"]
+    assert [json.loads(c.content)["medication_name"] for c in calls] == names
+    outputs = [
+        m for m in events[-1].messages if m.get("type") == "function_call_output"
+    ]
+    assert [o["output"] for o in outputs] == [c.tool_result for c in calls]
+
+
+async def test_invalid_arguments_do_not_end_the_turn(server: FakeResponsesServer):
+    command = (
+        'get_medication_stock {"medication": "Advil"}\n'
+        'get_medication_stock {"medication_name": "Advil"}'
+    )
+    events = await _turn([_user(command)])
+
+    assert [e.type for e in events if e.type == "error"] == []
+    invalid, valid = [e for e in events if e.type == "tool_call"]
+    assert "medication_name" in json.loads(invalid.tool_result)["error"]
+    assert json.loads(valid.tool_result)["found"] is True
+    assert events[-1].type == "done"
+
+
+async def test_chaining_sends_only_new_items(
+    server: FakeResponsesServer, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(agent, "RESPONSE_CHAINING", True)
+
+    events = await _turn([_user('get_medication_stock {"medication_name": "Advil"}')])
+    done = events[-1]
+    assert done.chain is not None
+    # Tool outputs are sent against the response that made the calls
+    first, second = server.requests
+    assert "previous_response_id" not in first
+    assert second["previous_response_id"]
+    assert [item["type"] for item in second["input"]] == ["function_call_output"]
+
+    history = [*done.messages, {"role": "assistant", "content": "..."}, _user("hi")]
+    events = await _turn(history, done.chain)
+
+    third = server.requests[2]
+    assert third["previous_response_id"] == done.chain.response_id
+    assert third["input"] == [_user("hi")]
+    assert "".join(e.content for e in events if e.type == "text") == "You said: hi"
+
+
+async def test_lost_chain_falls_back_to_full_history(
+    server: FakeResponsesServer, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(agent, "RESPONSE_CHAINING", True)
+
+    done = (await _turn([_user("hello")]))[-1]
+    server.forget_responses()
+    history = [*done.messages, {"role": "assistant", "content": "..."}, _user("hi")]
+    events = await _turn(history, done.chain)
+
+    assert [e.type for e in events if e.type == "error"] == []
+    rejected, retried = server.requests[1:]
+    assert rejected["previous_response_id"] == done.chain.response_id
+    assert "previous_response_id" not in retried
+    assert retried["input"] == history
+    assert events[-1].chain.response_id != done.chain.response_id
@@ -0,0 +1,77 @@
+"""Abandoned database calls give back their executor thread and connection."""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from db import connection
+
+# Counts far past anything that could finish within a test's timeout
+SLOW_QUERY = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000)
+    SELECT count(*) AS count FROM n
+"""
+
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _wait_until_idle(seconds: float = 2.0) -> int:
+    """Pooled connections still in use once the pool settles (or time runs out)."""
+    deadline = time.monotonic() + seconds
+    while connection.get_pool_stats().in_use and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return connection.get_pool_stats().in_use
+
+
+def test_call_within_timeout_returns_result() -> None:
+    result = asyncio.run(
+        connection.run_in_db_with_timeout(5, connection.query_one, "SELECT 1 AS one")
+    )
+    assert result == {"one": 1}
+
+
+def test_timeout_aborts_running_query() -> None:
+    began = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(
+            connection.run_in_db_with_timeout(0.1, connection.query_one, SLOW_QUERY)
+        )
+    assert time.monotonic() - began < 1
+    assert _wait_until_idle() == 0
+
+
+def test_repeated_timeouts_do_not_exhaust_executor_or_pool() -> None:
+    async def scenario() -> dict | None:
+        calls = [
+            connection.run_in_db_with_timeout(0.1, connection.query_one, SLOW_QUERY)
+            for _ in range(connection.POOL_SIZE * 3)
+        ]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert all(isinstance(result, TimeoutError) for result in results)
+        return await connection.run_in_db_with_timeout(
+            1, connection.query_one, "SELECT 1 AS one"
+        )
+
+    assert asyncio.run(scenario()) == {"one": 1}
+    assert _wait_until_idle() == 0
+
+
+def test_abandoned_call_cannot_check_out_again() -> None:
+    outcome: list[str] = []
+
+    def sleep_then_query() -> None:
+        # Abandoned while doing Python work, before it touches the database
+        time.sleep(0.3)
+        try:
+            with connection.get_db():
+                outcome.append("checked out")
+        except sqlite3.OperationalError as e:
+            outcome.append(str(e))
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(connection.run_in_db_with_timeout(0.1, sleep_then_query))
+    time.sleep(0.5)
+    assert outcome == ["interrupted"]
@@ -0,0 +1,163 @@
+"""
+Query plans for catalog lookups on a large catalog.
+
+Seeds a synthetic 100k-medication catalog and runs the repository lookups
+against it, then checks with EXPLAIN QUERY PLAN that every statement they
+issued is served from an index rather than a full table scan.
+"""
+
+import re
+import sqlite3
+from collections.abc import Iterator
+
+import pytest
+
+from db import cards, connection, medications
+from db.migrations import fill_name_keys
+
+CATALOG_SIZE = 100_000
+INGREDIENT_COUNT = 5_000
+
+# Lookups against these are checked; other statements (the pool's health
+# check, FTS5 reading its own config) never touch catalog rows
+_CATALOG_TABLE = re.compile(
+    r"\b(medications|ingredients|medication_ingredients|dosage_instructions"
+    r"|medication_cards)\b"
+)
+
+
+def _seed(conn: sqlite3.Connection) -> None:
+    """Insert a synthetic catalog: two ingredients and one dosage per medication."""
+    conn.executemany(
+        "INSERT INTO ingredients (id, name_en, name_he) VALUES (?, ?, ?)",
+        [
+            (i, f"Ingredient {i:05d}", f"רכיב {i:05d}")
+            for i in range(1, INGREDIENT_COUNT + 1)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO medications (id, name_en, name_he, price) VALUES (?, ?, ?, ?)",
+        [
+            (i, f"Medication {i:06d}", f"תרופה {i:06d}", 10.0)
+            for i in range(1, CATALOG_SIZE + 1)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO medication_ingredients (medication_id, ingredient_id) VALUES (?, ?)",
+        [
+            (i, (i + offset) % INGREDIENT_COUNT + 1)
+            for i in range(1, CATALOG_SIZE + 1)
+            for offset in (0, 1)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO dosage_instructions (medication_id, dosage, instructions) "
+        "VALUES (?, ?, ?)",
+        [(i, "500mg", "Take one tablet") for i in range(1, CATALOG_SIZE + 1)],
+    )
+    fill_name_keys(conn)
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory: pytest.TempPathFactory) -> Iterator[None]:
+    """Point the app at a fresh database holding the synthetic catalog."""
+    data_dir = tmp_path_factory.mktemp("data")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(connection, "DATA_DIR", data_dir)
+        mp.setattr(connection, "DATABASE_PATH", data_dir / "pharmacy.db")
+        connection.close_pool()
+        connection.close_writer()
+        connection.init_db()
+
+        conn = connection.get_connection()
+        try:
+            _seed(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+        yield
+        connection.close_pool()
+        connection.close_writer()
+    medications.clear_cache()
+
+
+@pytest.fixture
+def statements(catalog: None, monkeypatch: pytest.MonkeyPatch) -> Iterator[list[str]]:
+    """Record every SQL statement run on pooled connections (parameters bound)."""
+    recorded: list[str] = []
+    get_connection = connection.get_connection
+
+    def traced(read_only: bool = False) -> sqlite3.Connection:
+        conn = get_connection(read_only)
+        conn.set_trace_callback(recorded.append)
+        return conn
+
+    connection.close_pool()
+    medications.clear_cache()
+    monkeypatch.setattr(connection, "get_connection", traced)
+    yield recorded
+    connection.close_pool()
+
+
+def _full_scans(sql: str) -> list[str]:
+    """EXPLAIN QUERY PLAN steps of a statement that scan a whole table."""
+    conn = connection.get_connection(read_only=True)
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    finally:
+        conn.close()
+    # Only tables count: FTS5 reports its own index as "SCAN ... VIRTUAL
+    # TABLE INDEX", and "SCAN (subquery-N)" reads an already-filtered result
+    return [
+        row["detail"]
+        for row in plan
+        if row["detail"].startswith("SCAN")
+        and "VIRTUAL TABLE INDEX" not in row["detail"]
+        and not row["detail"].startswith("SCAN (subquery")
+    ]
+
+
+def _assert_indexed(statements: list[str]) -> None:
+    queries = [
+        sql
+        for sql in statements
+        if sql.lstrip().upper().startswith("SELECT") and _CATALOG_TABLE.search(sql)
+    ]
+    assert queries, "lookup ran no queries"
+    for sql in queries:
+        assert _full_scans(sql) == [], sql
+
+
+def test_english_name_lookup_uses_index(statements: list[str]) -> None:
+    medication = medications.get_by_name("MEDICATION 054321")
+    assert medication is not None
+    assert medication.id == 54321
+    _assert_indexed(statements)
+
+
+def test_hebrew_name_lookup_uses_index(statements: list[str]) -> None:
+    medication = medications.get_by_name("תרופה 054321", include_ingredients=True)
+    assert medication is not None
+    assert medication.id == 54321
+    assert len(medication.ingredients) == 2
+    _assert_indexed(statements)
+
+
+def test_ingredient_lookup_uses_index(statements: list[str]) -> None:
+    found = medications.get_by_ingredient("Ingredient 01234")
+    assert len(found) == CATALOG_SIZE * 2 // INGREDIENT_COUNT
+    _assert_indexed(statements)
+
+
+def test_dosage_instructions_lookup_uses_index(statements: list[str]) -> None:
+    instructions = medications.get_dosage_instructions(54321, "500MG")
+    assert [row["dosage"] for row in instructions] == ["500mg"]
+    _assert_indexed(statements)
+
+
+def test_card_lookup_uses_index(statements: list[str]) -> None:
+    card = cards.get_by_name("תרופה 054321")
+    assert card is not None
+    assert card["name_en"] == "Medication 054321"
+    _assert_indexed(statements)
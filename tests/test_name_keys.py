@@ -0,0 +1,59 @@
+import sqlite3
+from collections.abc import Iterator
+
+import pytest
+
+from db import cards, connection, medications
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture
+def other_client() -> Iterator[sqlite3.Connection]:
+    """A plain SQLite connection, without anything the app registers."""
+    conn = sqlite3.connect(connection.DATABASE_PATH, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def test_external_rename_clears_only_the_changed_key(other_client: sqlite3.Connection):
+    other_client.execute(
+        "UPDATE medications SET name_en = 'Acamol Forte' WHERE name_en = 'Acamol'"
+    )
+
+    keys = other_client.execute(
+        "SELECT name_en_key, name_he_key FROM medications WHERE name_he = 'אקמול'"
+    ).fetchone()
+    assert keys == (None, "אקמול")
+
+
+def test_lookups_find_externally_renamed_rows(other_client: sqlite3.Connection):
+    other_client.execute(
+        "UPDATE medications SET name_en = 'Acamol Forte' WHERE name_en = 'Acamol'"
+    )
+
+    assert medications.get_by_name("acamol forte").name_en == "Acamol Forte"
+    assert medications.get_by_name("אקמול").name_en == "Acamol Forte"
+    assert medications.get_by_name("Acamol") is None
+    assert cards.get_by_name("Acamol Forte")["name_en"] == "Acamol Forte"
+    assert cards.get_by_name("אקמול")["name_en"] == "Acamol Forte"
+
+
+def test_lookups_find_externally_inserted_rows(other_client: sqlite3.Connection):
+    # Cache a miss first; the sync must not be hidden behind it
+    assert medications.get_by_name("Zyrtéc Plus") is None
+
+    medication_id = other_client.execute(
+        "INSERT INTO medications (name_en, name_he, price) "
+        "VALUES ('Zyrtéc Plus', 'זירטק פלוס', 10)"
+    ).lastrowid
+    other_client.execute(
+        "INSERT INTO dosage_instructions (medication_id, dosage, instructions) "
+        "VALUES (?, '10 MG', 'Once daily')",
+        (medication_id,),
+    )
+
+    assert medications.get_by_name("zyrtec plus").id == medication_id
+    assert cards.get_by_name("זירטק פלוס")["id"] == medication_id
+    (instructions,) = medications.get_dosage_instructions(medication_id, "10 mg")
+    assert instructions["instructions"] == "Once daily"
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import pytest
+
+from agent.scheduler import ToolScheduler
+
+pytestmark = pytest.mark.anyio
+
+
+def _scheduler(log: list[str]) -> ToolScheduler:
+    """Scheduler over fake tools: "fail" raises, "write" mutates, others read."""
+
+    async def execute(name: str, arguments: str) -> str:
+        await asyncio.sleep(0)
+        if name == "fail":
+            raise ValueError(f"bad arguments: {arguments}")
+        log.append(name)
+        return json.dumps({"ok": name})
+
+    return ToolScheduler(execute, lambda name: name != "write")
+
+
+async def test_failed_call_gets_an_error_result():
+    log: list[str] = []
+    scheduler = _scheduler(log)
+    scheduler.submit("1", "read", "{}")
+    scheduler.submit("2", "fail", '{"x": 1}')
+    scheduler.submit("3", "read", "{}")
+
+    results = await scheduler.results()
+
+    assert [call_id for call_id, _ in results] == ["1", "2", "3"]
+    assert json.loads(results[1][1]) == {
+        "error": """Tool 'fail' failed: bad arguments: {"x": 1}"""
+    }
+    assert json.loads(results[2][1]) == {"ok": "read"}
+
+
+async def test_write_around_failed_call_still_reported():
+    log: list[str] = []
+    scheduler = _scheduler(log)
+    scheduler.submit("1", "write", "{}")
+    scheduler.submit("2", "fail", "{}")
+    scheduler.submit("3", "write", "{}")
+
+    results = dict(await scheduler.results())
+
+    assert log == ["write", "write"]
+    assert json.loads(results["1"]) == json.loads(results["3"]) == {"ok": "write"}
+    assert "error" in json.loads(results["2"])
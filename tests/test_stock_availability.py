@@ -0,0 +1,57 @@
+import pytest
+
+from db import stock
+from db.connection import execute, query_one
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture
+def acamol() -> int:
+    """Acamol stocked in several strengths, units and an unparseable dosage."""
+    medication_id = query_one("SELECT id FROM medications WHERE name_en = 'Acamol'")[
+        "id"
+    ]
+    for dosage in ("1g", "120mg/5ml", "1 tablet", "100mg"):
+        execute(
+            "INSERT INTO stock (medication_id, dosage, quantity) VALUES (?, ?, 10)",
+            (medication_id, dosage),
+        )
+    return medication_id
+
+
+def test_alternatives_closest_strength_first(acamol: int):
+    availability = stock.check_availability(acamol, "500mg")
+
+    assert availability.exact_match is not None
+    assert availability.exact_match.dosage == "500mg"
+    # Same unit family by distance to 500 mg, then other units, then unparsed
+    assert [s.dosage for s in availability.alternatives] == [
+        "250mg",
+        "100mg",
+        "1g",
+        "120mg/5ml",
+        "1 tablet",
+    ]
+
+
+def test_unparseable_dosage_keeps_strength_order(acamol: int):
+    availability = stock.check_availability(acamol, "1 tablet")
+
+    assert availability.exact_match.dosage == "1 tablet"
+    assert [s.dosage for s in availability.alternatives] == [
+        "100mg",
+        "120mg/5ml",
+        "250mg",
+        "500mg",
+        "1g",
+    ]
+
+
+@pytest.mark.parametrize("dosage", [None, "500mg", "40mg", "1 tablet", "2 g"])
+def test_bulk_matches_single_lookups(acamol: int, dosage: str | None):
+    ids = [acamol, 2, 9]
+    bulk = stock.check_availability_bulk(ids, dict.fromkeys(ids, dosage))
+
+    for medication_id in ids:
+        assert bulk[medication_id] == stock.check_availability(medication_id, dosage)